@@ -0,0 +1,300 @@
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, FrozenSet, Hashable, Optional, Tuple
+import hashlib
+import logging
+import time
+import faiss
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingIndex:
+    """Inner-product index over L2-normalized embeddings, so scores are cosine similarities.
+
+    Vectors live contiguously in a FAISS IndexFlatIP, which scores the whole
+    cache with SIMD kernels in a single search call.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._next_id = 0
+        self._ids: Dict[Hashable, int] = {}
+        self._keys: Dict[int, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: Hashable, embedding: np.ndarray):
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(embedding.shape[0]))
+
+        self.remove(key)
+        vector_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(embedding.reshape(1, -1), np.array([vector_id], dtype=np.int64))
+        self._ids[key] = vector_id
+        self._keys[vector_id] = key
+
+    def remove(self, key: Hashable):
+        vector_id = self._ids.pop(key, None)
+        if vector_id is not None:
+            self._index.remove_ids(np.array([vector_id], dtype=np.int64))
+            del self._keys[vector_id]
+
+    def search(self, embedding: np.ndarray) -> Tuple[Optional[Hashable], float]:
+        """Return the key of the closest embedding and its cosine similarity"""
+        if not self._ids:
+            return None, 0.0
+
+        scores, ids = self._index.search(embedding.reshape(1, -1), 1)
+        if ids[0][0] == -1:
+            return None, 0.0
+        return self._keys[int(ids[0][0])], float(scores[0][0])
+
+    def clear(self):
+        self._index = None
+        self._ids.clear()
+        self._keys.clear()
+
+def normalize_embedding(embedding) -> Optional[np.ndarray]:
+    """Return the embedding as a unit-length float32 vector, or None for a zero vector"""
+    embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else None
+
+class ResponseCache:
+    """Two-tier cache for processed query responses.
+
+    L1 is an exact-match LRU keyed by the normalized query text. L2 compares the
+    query embedding against previously answered queries and returns the closest
+    response when its cosine similarity reaches the configured threshold and both
+    queries mention the same schema entities, so "count orders" never answers
+    "count customers".
+
+    Entries are partitioned by a scope, normally the connection's schema
+    fingerprint, so results from one database are never served for another, and
+    expire after ttl seconds so result rows don't outlive changes to the data.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], np.ndarray],
+                 entity_fn: Callable[[str], FrozenSet[str]] = None,
+                 max_size: int = None, threshold: float = None, ttl: float = None):
+        self.embed_fn = embed_fn
+        self.entity_fn = entity_fn
+        self.max_size = max_size or settings.response_cache_size
+        self.threshold = threshold if threshold is not None else settings.semantic_cache_threshold
+        self.ttl = ttl if ttl is not None else settings.response_cache_ttl
+        self._responses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._entities: Dict[str, FrozenSet[str]] = {}
+        self._scopes: Dict[str, str] = {}
+        self._stored_at: Dict[str, float] = {}
+        self._indexes: Dict[str, EmbeddingIndex] = {}
+
+    @staticmethod
+    def _key(user_query: str, scope: str) -> str:
+        return hashlib.sha1(f"{scope}\0{user_query.strip().lower()}".encode()).hexdigest()
+
+    def _expired(self, key: str) -> bool:
+        return time.monotonic() - self._stored_at[key] > self.ttl
+
+    def _embed(self, user_query: str) -> Optional[np.ndarray]:
+        """Return the L2-normalized query embedding, or None if embedding fails"""
+        try:
+            return normalize_embedding(self.embed_fn(user_query))
+        except Exception as e:
+            logger.warning("Response cache embedding failed: %s", e)
+            return None
+
+    def _entity_set(self, user_query: str) -> FrozenSet[str]:
+        """Return the schema entities mentioned in the query"""
+        if self.entity_fn is None:
+            return frozenset()
+        try:
+            return self.entity_fn(user_query)
+        except Exception as e:
+            logger.warning("Response cache entity extraction failed: %s", e)
+            return frozenset()
+
+    def get(self, user_query: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """Return a cached response for the query within scope, or None on a miss"""
+        key = self._key(user_query, scope)
+
+        # L1: exact match on the normalized query
+        if key in self._responses:
+            if not self._expired(key):
+                self._responses.move_to_end(key)
+                logger.info("Response cache L1 hit")
+                return dict(self._responses[key], user_query=user_query)
+            self._evict(key)
+
+        # L2: nearest previously answered query in the same scope by cosine similarity
+        index = self._indexes.get(scope)
+        if index is None or not len(index):
+            return None
+
+        query_embedding = self._embed(user_query)
+        if query_embedding is None:
+            return None
+
+        best_key, score = index.search(query_embedding)
+        if best_key is None or score < self.threshold:
+            return None
+
+        if self._expired(best_key):
+            self._evict(best_key)
+            return None
+
+        # Paraphrases must still refer to the same tables and columns
+        entities = self._entity_set(user_query)
+        if entities != self._entities.get(best_key, frozenset()):
+            return None
+
+        logger.info("Response cache L2 hit (similarity %.3f)", score)
+        response = self._responses[best_key]
+        self._responses.move_to_end(best_key)
+
+        # Backfill L1 so the next identical query skips the embedding call; it keeps the
+        # original timestamp so the TTL still counts from when the query was executed
+        self._store(key, response, query_embedding, entities, scope, self._stored_at[best_key])
+        return dict(response, user_query=user_query)
+
+    def put(self, user_query: str, response: Dict[str, Any], scope: str = ""):
+        """Cache a successful response under both tiers"""
+        if response.get("error_message") or response.get("execution_result") is None:
+            return
+
+        key = self._key(user_query, scope)
+        self._store(key, response, self._embed(user_query), self._entity_set(user_query), scope)
+
+    def _store(self, key: str, response: Dict[str, Any], embedding: Optional[np.ndarray],
+               entities: FrozenSet[str], scope: str, stored_at: float = None):
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        self._entities[key] = entities
+        self._scopes[key] = scope
+        self._stored_at[key] = stored_at if stored_at is not None else time.monotonic()
+        if embedding is not None:
+            self._indexes.setdefault(scope, EmbeddingIndex()).add(key, embedding)
+
+        while len(self._responses) > self.max_size:
+            self._evict(next(iter(self._responses)))
+
+    def _evict(self, key: str):
+        self._responses.pop(key, None)
+        self._entities.pop(key, None)
+        self._stored_at.pop(key, None)
+        scope = self._scopes.pop(key, None)
+        index = self._indexes.get(scope)
+        if index is not None:
+            index.remove(key)
+            if not len(index):
+                del self._indexes[scope]
+
+    def clear(self):
+        """Drop all cached responses"""
+        self._responses.clear()
+        self._entities.clear()
+        self._scopes.clear()
+        self._stored_at.clear()
+        self._indexes.clear()
+
+class SchemaCache:
+    """Bounded store of retrieved schema elements keyed by query embedding.
+
+    get() returns the schema of a query whose int8-quantized embedding matches
+    exactly, so near-identical follow-ups skip the vector search. nearest() lets
+    the agent guess the schema for a paraphrased query before the vector search
+    for it has returned.
+
+    Like ResponseCache, entries are partitioned by scope (the schema fingerprint)
+    and expire after ttl seconds, so another database's tables are never reused.
+    """
+
+    def __init__(self, max_size: int = None, threshold: float = None, ttl: float = None):
+        self.max_size = max_size or settings.schema_cache_size
+        self.threshold = threshold if threshold is not None else settings.speculative_schema_threshold
+        self.ttl = ttl if ttl is not None else settings.schema_cache_ttl
+        self._entries: "OrderedDict[Tuple[str, bytes], List[Dict]]" = OrderedDict()
+        self._stored_at: Dict[Tuple[str, bytes], float] = {}
+        self._indexes: Dict[str, EmbeddingIndex] = {}
+
+    @staticmethod
+    def _quantize(embedding: np.ndarray) -> bytes:
+        return np.round(embedding * 127).astype(np.int8).tobytes()
+
+    def _expired(self, key: Tuple[str, bytes]) -> bool:
+        return time.monotonic() - self._stored_at[key] > self.ttl
+
+    def get(self, embedding: np.ndarray, scope: str = "") -> Optional[List[Dict]]:
+        """Return the schema cached within scope for the same quantized embedding"""
+        if embedding is None:
+            return None
+
+        embedding = normalize_embedding(embedding)
+        if embedding is None:
+            return None
+
+        key = (scope, self._quantize(embedding))
+        if key not in self._entries:
+            return None
+        if self._expired(key):
+            self._evict(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def nearest(self, embedding: np.ndarray, scope: str = "") -> Optional[List[Dict]]:
+        """Return the schema of the most similar cached query in scope above the threshold"""
+        if embedding is None:
+            return None
+
+        embedding = normalize_embedding(embedding)
+        if embedding is None:
+            return None
+
+        index = self._indexes.get(scope)
+        if index is None:
+            return None
+
+        best_key, score = index.search(embedding)
+        if best_key is None or score < self.threshold:
+            return None
+        if self._expired(best_key):
+            self._evict(best_key)
+            return None
+
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def put(self, embedding: np.ndarray, relevant_schema: List[Dict], scope: str = ""):
+        if embedding is None or not relevant_schema:
+            return
+
+        embedding = normalize_embedding(embedding)
+        if embedding is None:
+            return
+
+        key = (scope, self._quantize(embedding))
+        self._entries[key] = relevant_schema
+        self._entries.move_to_end(key)
+        self._stored_at[key] = time.monotonic()
+        self._indexes.setdefault(scope, EmbeddingIndex()).add(key, embedding)
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Tuple[str, bytes]):
+        self._entries.pop(key, None)
+        self._stored_at.pop(key, None)
+        index = self._indexes.get(key[0])
+        if index is not None:
+            index.remove(key)
+            if not len(index):
+                del self._indexes[key[0]]
+
+    def clear(self):
+        """Drop all cached schema sets"""
+        self._entries.clear()
+        self._stored_at.clear()
+        self._indexes.clear()
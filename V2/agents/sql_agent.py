@@ -2,57 +2,158 @@ from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain.schema import BaseOutputParser
 from langgraph.graph import StateGraph, END
-from typing import Dict, List, Any, TypedDict
+from typing import Dict, List, Any, FrozenSet, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+import asyncio
 import json
 import re
+import threading
+import sqlglot
+from sqlglot.errors import ParseError
 from config.settings import settings
 from semantic_layer.vector_store import semantic_layer
 from database.connection_manager import db_manager
+from agents.response_cache import ResponseCache, SchemaCache
 import logging
 
 logger = logging.getLogger(__name__)
 
-class SQLGenerationState(TypedDict):
+_CODE_FENCE = "```"
+# Uppercase SELECT at the start of a line; prose like "To select the top rows" never matches
+_SQL_LINE_START_RE = re.compile(r'^[ \t]*SELECT\b', re.MULTILINE)
+# A fenced SELECT block anywhere in the text, tried before any bare SQL
+_FENCED_SQL_RE = re.compile(r'```(?:sql)?\s*(SELECT\s.*?)\s*```', re.IGNORECASE | re.DOTALL)
+# Bare SQL from a line-anchored SELECT up to the first blank line
+_BARE_SQL_RE = re.compile(r'^[ \t]*(SELECT\b.*?)(?:\n[ \t]*\n|\Z)', re.MULTILINE | re.DOTALL)
+_STARTS_WITH_SELECT_RE = re.compile(r'\s*select', re.IGNORECASE)
+_WORD_SPLIT_RE = re.compile(r'\W+')
+_HAS_LIMIT_RE = re.compile(r'\b(?:limit|top)\b', re.IGNORECASE)
+# Server-side stop sequences; both only occur once a statement has been terminated
+SQL_STOP_SEQUENCES = [";\n\n", ";\n```"]
+_DANGEROUS_RE = re.compile(
+    r'\b(?:drop|delete|truncate|alter|create|insert|update|grant|revoke|exec)\b',
+    re.IGNORECASE
+)
+
+# sqlglot dialect names for the database types supported by db_manager
+_SQLGLOT_DIALECTS = {
+    "postgresql": "postgres",
+    "mysql": "mysql",
+    "oracle": "oracle"
+}
+
+SYSTEM_PROMPT = """You are an expert SQL query generator. Your task is to convert natural language queries into accurate, optimized SQL queries.
+
+Guidelines:
+1. Generate syntactically correct SQL queries
+2. Use appropriate JOINs when multiple tables are involved
+3. Apply proper WHERE clauses for filtering
+4. Use aggregate functions (COUNT, SUM, AVG, etc.) when needed
+5. Include ORDER BY and LIMIT clauses when appropriate
+6. Optimize for performance on large datasets
+7. Use table aliases for readability
+8. Handle date/time queries properly
+9. Consider NULL values in conditions
+
+Schema Information:
+{schema_context}
+
+Important Notes:
+- Only use tables and columns that exist in the schema
+- Be careful with data types and formatting
+- Use proper SQL syntax for the database type
+- If the query is ambiguous, make reasonable assumptions
+- Return only the SQL query without explanations"""
+
+HUMAN_PROMPT = """Convert this natural language query to SQL:
+{user_query}
+
+Return only the SQL query."""
+
+REFINE_PROMPT = """The previous SQL query had an error. Please fix it.
+
+Original Query Request: {user_query}
+Previous SQL: {generated_sql}
+Error: {error_message}
+
+Schema Information:
+{schema_context}
+
+Please generate a corrected SQL query that addresses the error while fulfilling the original request.
+Return only the corrected SQL query."""
+
+@dataclass
+class SQLGenerationState:
     user_query: str
-    relevant_schema: List[Dict]
-    generated_sql: str
-    validated_sql: str
-    execution_result: Any
-    error_message: str
-    confidence_score: float
+    relevant_schema: List[Dict] = field(default_factory=list)
+    generated_sql: str = ""
+    validated_sql: str = ""
+    execution_result: Any = None
+    error_message: str = ""
+    confidence_score: float = 0.0
+    schema_context: str = ""
+    refinement_count: int = 0
+    previous_sql: str = ""
+
+@lru_cache(maxsize=128)
+def _build_schema_context(schema_items: Tuple[Tuple[str, str, str, str], ...]) -> str:
+    """Render (type, table, column, data_type) tuples into the prompt schema block"""
+    # Group columns under their table; tables and columns are retrieved separately
+    table_columns: Dict[str, List[str]] = {}
+    for item_type, table, column, data_type in schema_items:
+        if item_type == "table":
+            table_columns.setdefault(table, [])
+        elif item_type == "column":
+            table_columns.setdefault(table, []).append(f"  - {column} ({data_type})\n")
+    
+    parts = []
+    for table, columns in table_columns.items():
+        parts.append(f"\nTable: {table}\n")
+        parts.extend(columns)
+    
+    return "".join(parts)
+
+def _sql_complete(text: str) -> bool:
+    """Whether a partial completion already holds a full SQL statement
+    
+    A fenced block is complete at its closing fence; bare SQL is complete at the
+    first ';' after a line-anchored SELECT. Anything else keeps streaming.
+    """
+    match = _SQL_LINE_START_RE.search(text)
+    fence = text.find(_CODE_FENCE)
+    if fence != -1 and (match is None or fence < match.start()):
+        return text.find(_CODE_FENCE, fence + len(_CODE_FENCE)) != -1
+    
+    return match is not None and text.find(';', match.end()) != -1
+
+def _normalize_sql(sql: str) -> str:
+    """Collapse whitespace and case so cosmetic rewrites compare equal"""
+    return " ".join(sql.split()).lower()
 
 class SQLOutputParser(BaseOutputParser):
     def parse(self, text: str) -> str:
         # Clean the input text
         text = text.strip()
         
-        # Extract SQL from markdown code blocks first
-        sql_pattern = r'```(?:sql)?\s*(.*?)\s*```'
-        match = re.search(sql_pattern, text, re.DOTALL | re.IGNORECASE)
+        # A fenced block wins over anything outside it, so prose before the fence is ignored
+        match = _FENCED_SQL_RE.search(text)
         if match:
-            sql_content = match.group(1).strip()
-            if sql_content and sql_content.upper().startswith('SELECT'):
-                return sql_content
+            return match.group(1)
         
-        # Try to find SQL without markdown - more comprehensive pattern
-        sql_pattern = r'(SELECT\s+.*?)(?:\n\n|$)'
-        match = re.search(sql_pattern, text, re.DOTALL | re.IGNORECASE)
+        # Otherwise a bare SELECT starting a line, running up to the first blank line
+        match = _BARE_SQL_RE.search(text)
         if match:
-            sql_content = match.group(1).strip()
             # Remove trailing semicolon if present
-            if sql_content.endswith(';'):
-                sql_content = sql_content[:-1]
-            return sql_content
+            return match.group(1).strip().rstrip(';').rstrip()
         
         # If the entire text looks like SQL, return it
-        if text.upper().startswith('SELECT'):
+        if text[:6].upper() == 'SELECT':
             # Remove trailing semicolon if present
-            if text.endswith(';'):
-                text = text[:-1]
-            return text
+            return text.rstrip(';').rstrip()
         
         # Last resort - return the text as is but log a warning
-        logger.warning(f"Could not parse SQL from: {text[:100]}...")
+        logger.warning("Could not parse SQL from: %.100s...", text)
         return text
 
 class SQLAgent:
@@ -62,8 +163,74 @@ class SQLAgent:
             model_name=settings.chat_model,
             temperature=0.1
         )
+        # Lets Groq end the completion itself instead of relying on the client closing the stream
+        self._sql_llm = self.llm.bind(stop=SQL_STOP_SEQUENCES)
         self.sql_parser = SQLOutputParser()
+        
+        # Build prompt templates and chains once and reuse them for every query
+        self._gen_prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT),
+            HumanMessagePromptTemplate.from_template(HUMAN_PROMPT)
+        ])
+        self._gen_chain = self._gen_prompt | self._sql_llm
+        self._refine_prompt = ChatPromptTemplate.from_template(REFINE_PROMPT)
+        self._refine_chain = self._refine_prompt | self._sql_llm | self.sql_parser
+        
         self.graph = self._create_workflow()
+        # ChatGroq's async HTTP client stays bound to the loop it first ran on, so
+        # process_query submits to this persistent loop rather than calling asyncio.run
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="sql-agent-loop", daemon=True).start()
+        self.response_cache = ResponseCache(self._embed_query, self._query_entities)
+        self.schema_cache = SchemaCache()
+        # Reconnecting or re-inspecting the database makes every cached answer and schema set suspect
+        db_manager.add_invalidation_listener(self._on_schema_invalidated)
+    
+    def _on_schema_invalidated(self, connection_name: str):
+        """Drop cached responses and schema sets when the default connection changes"""
+        if connection_name == "default":
+            self.response_cache.clear()
+            self.schema_cache.clear()
+    
+    async def _stream_sql(self, user_query: str, schema_context: str) -> str:
+        """Stream the completion and stop reading once the SQL statement is complete"""
+        buf = []
+        stream = self._gen_chain.astream({
+            "schema_context": schema_context,
+            "user_query": user_query
+        })
+        try:
+            async for chunk in stream:
+                buf.append(chunk.content)
+                # Closing the stream early drops the connection so no further tokens are generated
+                if _sql_complete("".join(buf)):
+                    break
+        finally:
+            await stream.aclose()
+        
+        return self.sql_parser.parse("".join(buf))
+    
+    def _embed_query(self, user_query: str):
+        """Embed a user query through the semantic layer's query LRU
+        
+        The response cache, speculative generation and schema search all embed the same
+        text, so only the first of them runs the model.
+        """
+        return semantic_layer.embed_query(user_query)
+    
+    @staticmethod
+    def _cache_scope() -> str:
+        """Schema fingerprint of the current connection, so cached responses never cross databases"""
+        try:
+            return db_manager.get_schema_fingerprint()
+        except Exception as e:
+            logger.warning("Schema fingerprint unavailable, using the unscoped response cache: %s", e)
+            return ""
+    
+    def _query_entities(self, user_query: str) -> FrozenSet[str]:
+        """Return the known table and column names mentioned in a user query"""
+        tokens = set(_WORD_SPLIT_RE.split(user_query.lower()))
+        return semantic_layer.get_schema_entities("default") & tokens
     
     def _create_workflow(self) -> StateGraph:
         """Create LangGraph workflow for SQL generation"""
@@ -93,243 +260,296 @@ class SQLAgent:
         )
         
         workflow.add_edge("execute_sql", END)
-        workflow.add_edge("refine_sql", "validate_sql")
+        
+        # A stalled or failed refinement ends the run so its error message is kept
+        workflow.add_conditional_edges(
+            "refine_sql",
+            self._should_revalidate,
+            {
+                "validate": "validate_sql",
+                "end": END
+            }
+        )
         
         return workflow.compile()
     
-    def _analyze_query(self, state: SQLGenerationState) -> SQLGenerationState:
+    def _search_schema(self, user_query: str) -> List[Dict]:
+        """Search for relevant tables and columns with separate, smaller searches"""
+        tables = semantic_layer.search_relevant_schema(
+            user_query, 
+            connection_name="default", 
+            top_k=settings.schema_top_k_tables,
+            type_filter="table"
+        )
+        columns = semantic_layer.search_relevant_schema(
+            user_query, 
+            connection_name="default", 
+            top_k=settings.schema_top_k_columns,
+            type_filter="column"
+        )
+        return tables + columns
+    
+    async def _analyze_query(self, state: SQLGenerationState) -> SQLGenerationState:
         """Analyze user query and find relevant schema elements"""
         try:
-            user_query = state["user_query"]
+            # Schema may already have been retrieved by process_query
+            if state.relevant_schema:
+                return state
             
-            # Search for relevant schema elements
-            relevant_schema = semantic_layer.search_relevant_schema(
-                user_query, 
-                connection_name="default", 
-                top_k=15
-            )
+            relevant_schema = await asyncio.to_thread(self._search_schema, state.user_query)
             
-            state["relevant_schema"] = relevant_schema
-            logger.info(f"Found {len(relevant_schema)} relevant schema elements")
+            state.relevant_schema = relevant_schema
+            logger.info("Found %s relevant schema elements", len(relevant_schema))
             
         except Exception as e:
-            logger.error(f"Query analysis failed: {str(e)}")
-            state["error_message"] = f"Query analysis failed: {str(e)}"
+            logger.error("Query analysis failed: %s", e)
+            state.error_message = f"Query analysis failed: {str(e)}"
         
         return state
     
-    def _generate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _generate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Generate SQL query based on natural language input"""
         try:
-            user_query = state["user_query"]
-            relevant_schema = state["relevant_schema"]
+            user_query = state.user_query
+            relevant_schema = state.relevant_schema
             
             # Create schema context
             schema_context = self._format_schema_context(relevant_schema)
-            logger.info(f"CONTEXT SCHEMA: {schema_context}")
+            state.schema_context = schema_context
+            logger.info("CONTEXT SCHEMA: %s", schema_context)
             
-            system_prompt = """You are an expert SQL query generator. Your task is to convert natural language queries into accurate, optimized SQL queries.
-
-Guidelines:
-1. Generate syntactically correct SQL queries
-2. Use appropriate JOINs when multiple tables are involved
-3. Apply proper WHERE clauses for filtering
-4. Use aggregate functions (COUNT, SUM, AVG, etc.) when needed
-5. Include ORDER BY and LIMIT clauses when appropriate
-6. Optimize for performance on large datasets
-7. Use table aliases for readability
-8. Handle date/time queries properly
-9. Consider NULL values in conditions
-
-Schema Information:
-{schema_context}
-
-Important Notes:
-- Only use tables and columns that exist in the schema
-- Be careful with data types and formatting
-- Use proper SQL syntax for the database type
-- If the query is ambiguous, make reasonable assumptions
-- Return only the SQL query without explanations"""
-
-            human_prompt = """Convert this natural language query to SQL:
-{user_query}
-
-Return only the SQL query."""
-
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessagePromptTemplate.from_template(system_prompt),
-                HumanMessagePromptTemplate.from_template(human_prompt)
-            ])
-            
-            chain = prompt | self.llm | self.sql_parser
+            # SQL may already have been generated speculatively by process_query
+            if state.generated_sql:
+                return state
             
-            generated_sql = chain.invoke({
-                "schema_context": schema_context,
-                "user_query": user_query
-            })
-            logger.info(f"GENERATED SQL: {generated_sql}")
+            generated_sql = await self._stream_sql(user_query, schema_context)
+            logger.info("GENERATED SQL: %s", generated_sql)
             
-            state["generated_sql"] = generated_sql
+            state.generated_sql = generated_sql
             logger.info("SQL query generated successfully")
             
         except Exception as e:
-            logger.error(f"SQL generation failed: {str(e)}")
-            state["error_message"] = f"SQL generation failed: {str(e)}"
+            logger.error("SQL generation failed: %s", e)
+            state.error_message = f"SQL generation failed: {str(e)}"
         
         return state
     
-    def _validate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _validate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Validate the generated SQL query"""
         try:
-            generated_sql = state["generated_sql"]
+            generated_sql = state.generated_sql
             
             if not generated_sql:
-                state["error_message"] = "No SQL query generated"
+                state.error_message = "No SQL query generated"
                 return state
             
-            # Basic SQL syntax validation
-            sql_lower = generated_sql.lower().strip()
-            
             # Check for basic SQL structure
-            if not sql_lower.startswith('select'):
-                state["error_message"] = "Query must start with SELECT"
+            if not _STARTS_WITH_SELECT_RE.match(generated_sql):
+                state.error_message = "Query must start with SELECT"
                 return state
             
             # Check for potential SQL injection patterns
-            dangerous_patterns = ['drop', 'delete', 'truncate', 'alter', 'create', 'insert', 'update']
-            for pattern in dangerous_patterns:
-                if pattern in sql_lower:
-                    state["error_message"] = f"Potentially dangerous SQL operation detected: {pattern}"
-                    return state
+            dangerous_match = _DANGEROUS_RE.search(generated_sql)
+            if dangerous_match:
+                state.error_message = f"Potentially dangerous SQL operation detected: {dangerous_match.group(0)}"
+                return state
             
-            # Try to validate with database (dry run)
+            # Parse locally instead of round-tripping to the database
             try:
-                # Add LIMIT to prevent large result sets during validation
-                validation_sql = generated_sql
-                if 'limit' not in sql_lower and 'top' not in sql_lower:
-                    validation_sql += " LIMIT 1"
+                dialect = _SQLGLOT_DIALECTS.get(db_manager.db_types.get("default"))
+                sqlglot.parse_one(generated_sql, read=dialect)
+                
+                # Optionally let the database plan the query to catch unknown tables/columns
+                if settings.validate_with_explain:
+                    await asyncio.to_thread(db_manager.execute_query, f"EXPLAIN {generated_sql}")
                 
-                # Test query execution
-                db_manager.execute_query(validation_sql)
-                state["validated_sql"] = generated_sql
-                state["confidence_score"] = 0.9
+                state.validated_sql = generated_sql
+                state.confidence_score = 0.9
                 
+            except ParseError as parse_error:
+                state.error_message = f"SQL parse error: {str(parse_error)}"
+                state.confidence_score = 0.3
             except Exception as db_error:
-                state["error_message"] = f"SQL validation failed: {str(db_error)}"
-                state["confidence_score"] = 0.3
+                state.error_message = f"SQL validation failed: {str(db_error)}"
+                state.confidence_score = 0.3
             
         except Exception as e:
-            logger.error(f"SQL validation failed: {str(e)}")
-            state["error_message"] = f"SQL validation failed: {str(e)}"
+            logger.error("SQL validation failed: %s", e)
+            state.error_message = f"SQL validation failed: {str(e)}"
         
         return state
     
-    def _execute_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _execute_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Execute the validated SQL query"""
         try:
-            validated_sql = state["validated_sql"]
+            validated_sql = state.validated_sql
             
             # Add safety limit if not present
-            sql_lower = validated_sql.lower()
-            if 'limit' not in sql_lower and 'top' not in sql_lower:
+            if not _HAS_LIMIT_RE.search(validated_sql):
                 validated_sql += f" LIMIT {settings.max_query_results}"
             
-            result = db_manager.execute_query(validated_sql)
-            state["execution_result"] = result
-            logger.info(f"SQL executed successfully, returned {len(result)} rows")
+            result = await asyncio.to_thread(db_manager.execute_query_stream, validated_sql, settings.max_query_results)
+            state.execution_result = result
+            logger.info("SQL executed successfully, returned %s rows", len(result))
             
         except Exception as e:
-            logger.error(f"SQL execution failed: {str(e)}")
-            state["error_message"] = f"SQL execution failed: {str(e)}"
+            logger.error("SQL execution failed: %s", e)
+            state.error_message = f"SQL execution failed: {str(e)}"
         
         return state
     
-    def _refine_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _refine_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Refine SQL query based on validation errors"""
         try:
-            user_query = state["user_query"]
-            generated_sql = state["generated_sql"]
-            error_message = state["error_message"]
-            relevant_schema = state["relevant_schema"]
+            user_query = state.user_query
+            generated_sql = state.generated_sql
+            error_message = state.error_message
+            relevant_schema = state.relevant_schema
             
-            schema_context = self._format_schema_context(relevant_schema)
+            state.previous_sql = generated_sql
+            state.refinement_count += 1
             
-            refine_prompt = """The previous SQL query had an error. Please fix it.
-
-Original Query Request: {user_query}
-Previous SQL: {generated_sql}
-Error: {error_message}
-
-Schema Information:
-{schema_context}
-
-Please generate a corrected SQL query that addresses the error while fulfilling the original request.
-Return only the corrected SQL query."""
-
-            prompt = ChatPromptTemplate.from_template(refine_prompt)
-            chain = prompt | self.llm | self.sql_parser
+            # Reuse the context built in _generate_sql
+            schema_context = state.schema_context or self._format_schema_context(relevant_schema)
             
-            refined_sql = chain.invoke({
+            refined_sql = await self._refine_chain.ainvoke({
                 "user_query": user_query,
                 "generated_sql": generated_sql,
                 "error_message": error_message,
                 "schema_context": schema_context
             })
             
-            state["generated_sql"] = refined_sql
-            state["error_message"] = ""  # Clear previous error
+            # The LLM often returns the same broken query; stop instead of looping on it
+            if _normalize_sql(refined_sql) == _normalize_sql(generated_sql):
+                logger.warning("SQL refinement stalled, refined query is unchanged")
+                state.error_message = f"Refinement stalled: {error_message}"
+                return state
+            
+            state.generated_sql = refined_sql
+            state.error_message = ""  # Clear previous error
             logger.info("SQL query refined")
             
         except Exception as e:
-            logger.error(f"SQL refinement failed: {str(e)}")
-            state["error_message"] = f"SQL refinement failed: {str(e)}"
+            logger.error("SQL refinement failed: %s", e)
+            state.error_message = f"SQL refinement failed: {str(e)}"
         
         return state
     
     def _should_execute_or_refine(self, state: SQLGenerationState) -> str:
         """Decide whether to execute, refine, or end based on validation results"""
-        if state.get("error_message"):
+        if state.error_message:
+            # Stop once the refinement budget is spent or refinement made no progress
+            if state.refinement_count >= settings.max_refinements:
+                return "end"
+            if state.refinement_count and state.generated_sql == state.previous_sql:
+                return "end"
+            
             # If there's an error and we haven't tried refining yet, try to refine
-            if state.get("confidence_score", 0) < 0.5:
+            if state.confidence_score < 0.5:
                 return "refine"
             else:
                 return "end"  # Give up after refinement attempt
-        elif state.get("validated_sql"):
+        elif state.validated_sql:
             return "execute"
         else:
             return "end"
     
+    def _should_revalidate(self, state: SQLGenerationState) -> str:
+        """Validate refined SQL; _refine_sql only leaves an error when it produced nothing new"""
+        return "end" if state.error_message else "validate"
+    
     def _format_schema_context(self, relevant_schema: List[Dict]) -> str:
         """Format schema information for the prompt"""
-        context = ""
-        tables_seen = set()
+        schema_items = tuple(
+            (
+                item["metadata"].get("type", ""),
+                item["metadata"].get("table", ""),
+                item["metadata"].get("column", ""),
+                item["metadata"].get("data_type", "")
+            )
+            for item in relevant_schema
+        )
+        return _build_schema_context(schema_items)
+    
+    @staticmethod
+    def _schema_ids(relevant_schema: List[Dict]) -> frozenset:
+        return frozenset(
+            (item["metadata"].get("type"), item["metadata"].get("table"), item["metadata"].get("column"))
+            for item in relevant_schema
+        )
+    
+    async def _prepare_schema_and_sql(self, user_query: str, scope: str = ""):
+        """Run the schema search while speculatively generating SQL from a cached schema.
+        
+        If a previous, similar query retrieved the same schema elements the fresh
+        search returns, the speculative SQL is used and the serial LLM call after
+        the search is skipped. Otherwise only the fresh schema is returned.
+        Cached schema sets are only reused within scope, the current schema fingerprint.
+        """
+        try:
+            query_embedding = self._embed_query(user_query)
+        except Exception as e:
+            logger.warning("Query embedding failed, skipping speculative generation: %s", e)
+            query_embedding = None
+        
+        # Near-identical follow-up: reuse the schema set and skip the search
+        cached_schema = self.schema_cache.get(query_embedding, scope)
+        if cached_schema is not None:
+            return cached_schema, ""
         
-        for item in relevant_schema:
-            metadata = item["metadata"]
-            if metadata["type"] == "table" and metadata["table"] not in tables_seen:
-                context += f"\nTable: {metadata['table']}\n"
-                tables_seen.add(metadata["table"])
-            elif metadata["type"] == "column":
-                context += f"  - {metadata['column']} ({metadata['data_type']})\n"
+        cached_schema = self.schema_cache.nearest(query_embedding, scope)
         
-        return context
+        speculative_task = None
+        if cached_schema is not None:
+            speculative_task = asyncio.ensure_future(self._stream_sql(
+                user_query, self._format_schema_context(cached_schema)
+            ))
+        
+        try:
+            relevant_schema = await asyncio.to_thread(self._search_schema, user_query)
+        except Exception as e:
+            # Leave the search to _analyze_query, which records the error on the state
+            logger.warning("Concurrent schema search failed: %s", e)
+            if speculative_task is not None:
+                speculative_task.cancel()
+            return [], ""
+        
+        self.schema_cache.put(query_embedding, relevant_schema, scope)
+        
+        if speculative_task is None:
+            return relevant_schema, ""
+        
+        if self._schema_ids(cached_schema) != self._schema_ids(relevant_schema):
+            speculative_task.cancel()
+            return relevant_schema, ""
+        
+        try:
+            generated_sql = await speculative_task
+            logger.info("Using speculatively generated SQL")
+            return relevant_schema, generated_sql
+        except Exception as e:
+            logger.warning("Speculative SQL generation failed: %s", e)
+            return relevant_schema, ""
     
-    def process_query(self, user_query: str) -> Dict[str, Any]:
+    async def aprocess_query(self, user_query: str) -> Dict[str, Any]:
         """Process natural language query and return results"""
         try:
+            scope = await asyncio.to_thread(self._cache_scope)
+            cached = self.response_cache.get(user_query, scope)
+            if cached is not None:
+                return cached
+            
+            relevant_schema, generated_sql = await self._prepare_schema_and_sql(user_query, scope)
+            
             initial_state = SQLGenerationState(
                 user_query=user_query,
-                relevant_schema=[],
-                generated_sql="",
-                validated_sql="",
-                execution_result=None,
-                error_message="",
-                confidence_score=0.0
+                relevant_schema=relevant_schema,
+                generated_sql=generated_sql
             )
             
-            final_state = self.graph.invoke(initial_state)
+            final_state = await self.graph.ainvoke(initial_state)
             
-            return {
+            result = {
                 "user_query": final_state["user_query"],
                 "generated_sql": final_state.get("validated_sql") or final_state.get("generated_sql"),
                 "execution_result": final_state.get("execution_result"),
@@ -338,8 +558,11 @@ Return only the corrected SQL query."""
                 "relevant_schema": final_state.get("relevant_schema", [])
             }
             
+            self.response_cache.put(user_query, result, scope)
+            return result
+            
         except Exception as e:
-            logger.error(f"Query processing failed: {str(e)}")
+            logger.error("Query processing failed: %s", e)
             return {
                 "user_query": user_query,
                 "generated_sql": "",
@@ -348,6 +571,19 @@ Return only the corrected SQL query."""
                 "confidence_score": 0.0,
                 "relevant_schema": []
             }
+    
+    def process_query(self, user_query: str) -> Dict[str, Any]:
+        """Synchronous wrapper around aprocess_query, run on the agent's event loop"""
+        return asyncio.run_coroutine_threadsafe(self.aprocess_query(user_query), self._loop).result()
+
+# Global instance, constructed on first access (PEP 562) so importing this
+# module does not build the LLM client and workflow
+_sql_agent = None
 
-# Global instance
-sql_agent = SQLAgent()
+def __getattr__(name: str):
+    global _sql_agent
+    if name == "sql_agent":
+        if _sql_agent is None:
+            _sql_agent = SQLAgent()
+        return _sql_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
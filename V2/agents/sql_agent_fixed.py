@@ -1,17 +1,124 @@
 from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain.schema import BaseOutputParser
 from langgraph.graph import StateGraph, END
-from typing import Dict, List, Any, TypedDict
+from pydantic import BaseModel, Field
+from typing import Dict, List, Any, Tuple, TypedDict
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+import asyncio
 import json
 import re
+import string
+import threading
+import httpx
 from config.settings import settings
 from semantic_layer.enhanced_semantic_layer import enhanced_semantic_layer
 from database.connection_manager import db_manager
+from agents.response_cache import ResponseCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# google-re2 gives linear-time matching for the parser and validation patterns when installed
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# Only responses at least this confident are served again from the cache
+_MIN_CACHE_CONFIDENCE = 0.7
+# Entries kept in the exact-match SQL cache and the retrieved-schema cache
+_SQL_CACHE_SIZE = 1024
+_SCHEMA_CACHE_SIZE = 256
+# Keep-alive pool for the Groq API so warm connections skip the TCP/TLS handshake
+_LLM_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60)
+_LLM_HTTP_TIMEOUT = 30
+
+# Compiled once at import; tried in order by ImprovedSQLOutputParser.parse.
+# Flags are inline and "$" stands in for \Z (inputs are stripped) so every pattern
+# compiles under both RE2 and the stdlib re module.
+_SQL_CODE_BLOCK_PATTERNS = [
+    _regex.compile(r'(?is)```sql\s*(.*?)\s*```'),
+    _regex.compile(r'(?is)```\s*(SELECT.*?)\s*```'),
+    _regex.compile(r'(?is)```(.*?)```')
+]
+_SELECT_PATTERNS = [
+    _regex.compile(r'(?is)(SELECT\s+.*?)(?:\n\n|$)'),
+    _regex.compile(r'(?is)(SELECT\s+.*?)(?:;|$)'),
+    _regex.compile(r'(?is)(SELECT.*?)(?:\n\n|$)')
+]
+# Whole-word match so identifiers like created_at or last_update are not flagged
+_DANGEROUS_SQL_RE = _regex.compile(
+    r'(?i)\b(?:drop|delete|truncate|alter|create|insert|update)\b'
+)
+_SQL_EXTRACT_RE = _regex.compile(r'(?i)(SELECT\b[\s\S]*?)(?:;|\n\s*\n|$)')
+# Uppercase SELECT starting a line or a code fence; "select" inside prose never matches
+_SQL_START_RE = _regex.compile(r'(?m)(?:^[ \t]*|```(?:sql)?[ \t]*)(SELECT)\b')
+# Characters of already-scanned text rescanned with each chunk, so a split SELECT still matches
+_STREAM_SCAN_OVERLAP = 16
+_LIMIT_RE = _regex.compile(r'(?i)\blimit\b')
+_TOP_RE = _regex.compile(r'(?i)\btop\b')
+
+def _analyze_sql(sql: str) -> Tuple[str, bool, bool]:
+    """Return (normalized_sql, starts_with_select, has_limit) for a query
+    
+    Only bounded slices are inspected for SELECT / TOP (prefix) and LIMIT (tail), so
+    long queries are not lowercased as a whole.
+    """
+    normalized_sql = ' '.join(sql.split()).rstrip(';').rstrip()
+    prefix = normalized_sql[:16]
+    starts_with_select = prefix.casefold().startswith('select')
+    has_limit = bool(_LIMIT_RE.search(normalized_sql[-64:]) or _TOP_RE.search(prefix))
+    return normalized_sql, starts_with_select, has_limit
+
+SYSTEM_TMPL = string.Template("""You are a PostgreSQL expert. Convert the user's question into one valid PostgreSQL query.
+
+Schema:
+$schema
+
+Rules: use only the tables and columns above; add WHERE, GROUP BY, ORDER BY as needed; make reasonable assumptions if ambiguous.
+Output: one SELECT query only, no markdown, no explanations.""")
+
+HUMAN_TMPL = string.Template("""Question: $query
+SQL:""")
+
+REFINE_TMPL = string.Template("""The previous SQL query had an error. Please fix it.
+
+Original Query Request: $query
+Previous SQL: $sql
+Error: $error
+
+Schema Information:
+$schema
+
+Please generate a corrected PostgreSQL SQL query that addresses the error while fulfilling the original request.
+Return only the corrected SQL query without any formatting or explanations.""")
+
+@lru_cache(maxsize=256)
+def _embed_text(user_query: str):
+    """Embed a user query once, shared by the response cache lookup and store"""
+    return enhanced_semantic_layer.embedding_model.encode([user_query], normalize_embeddings=True)[0]
+
+@lru_cache(maxsize=256)
+def _build_schema_context(schema_items: Tuple[Tuple[str, str, str, str], ...]) -> str:
+    """Render (type, table, column, data_type) tuples into the prompt schema block"""
+    # Group by table, dropping repeated columns while keeping retrieval order
+    table_info: Dict[str, Dict[Tuple[str, str], None]] = {}
+    for item_type, table_name, column_name, data_type in schema_items:
+        if not table_name:
+            continue
+        if item_type == "table":
+            table_info.setdefault(table_name, {})
+        elif item_type == "column" and column_name:
+            table_info.setdefault(table_name, {})[(column_name, data_type)] = None
+    
+    # Limit columns to prevent prompt overflow
+    return "".join(
+        f"\nTable: {table_name}\n" + "".join(f"  - {column} ({data_type})\n" for column, data_type in list(columns)[:10])
+        for table_name, columns in table_info.items()
+    )
+
 class SQLGenerationState(TypedDict):
     user_query: str
     relevant_schema: List[Dict]
@@ -21,6 +128,12 @@ class SQLGenerationState(TypedDict):
     error_message: str
     confidence_score: float
     refinement_attempts: int  # Track refinement attempts
+    has_limit: bool  # Set by _validate_sql, reused by _execute_sql
+    schema_context: str  # Set by _generate_sql, reused by _refine_sql
+
+class SQLResponse(BaseModel):
+    """Structured model output: a single SQL statement"""
+    sql: str = Field(description="One complete PostgreSQL SELECT query, without markdown or explanation")
 
 class ImprovedSQLOutputParser(BaseOutputParser):
     def parse(self, text: str) -> str:
@@ -31,14 +144,8 @@ class ImprovedSQLOutputParser(BaseOutputParser):
         text = text.strip()
         
         # Method 1: Extract from code blocks
-        patterns = [
-            r'```sql\s*(.*?)\s*```',
-            r'```\s*(SELECT.*?)\s*```',
-            r'```(.*?)```'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        for pattern in _SQL_CODE_BLOCK_PATTERNS:
+            match = pattern.search(text)
             if match:
                 sql_content = match.group(1).strip()
                 if sql_content and 'SELECT' in sql_content.upper():
@@ -46,14 +153,8 @@ class ImprovedSQLOutputParser(BaseOutputParser):
                     return self._clean_sql(sql_content)
         
         # Method 2: Look for SELECT statements
-        select_patterns = [
-            r'(SELECT\s+.*?)(?:\n\n|\Z)',
-            r'(SELECT\s+.*?)(?:;|\Z)',
-            r'(SELECT.*?)(?:\n\n|\Z)'
-        ]
-        
-        for pattern in select_patterns:
-            match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        for pattern in _SELECT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 sql_content = match.group(1).strip()
                 logger.info(f"Extracted SQL with pattern: {sql_content}")
@@ -64,33 +165,12 @@ class ImprovedSQLOutputParser(BaseOutputParser):
             logger.info(f"Using direct SQL: {text}")
             return self._clean_sql(text)
         
-        # Method 4: Look for any SQL-like content
-        if any(keyword in text.upper() for keyword in ['SELECT', 'FROM', 'WHERE']):
-            # Try to extract the SQL part
-            lines = text.split('\n')
-            sql_lines = []
-            in_sql = False
-            
-            for line in lines:
-                line = line.strip()
-                if line.upper().startswith('SELECT'):
-                    in_sql = True
-                    sql_lines.append(line)
-                elif in_sql and line:
-                    if any(keyword in line.upper() for keyword in ['FROM', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT']):
-                        sql_lines.append(line)
-                    elif line.endswith(';'):
-                        sql_lines.append(line)
-                        break
-                    elif not line.replace(',', '').replace('(', '').replace(')', '').strip():
-                        continue
-                    else:
-                        sql_lines.append(line)
-            
-            if sql_lines:
-                sql_content = ' '.join(sql_lines)
-                logger.info(f"Reconstructed SQL: {sql_content}")
-                return self._clean_sql(sql_content)
+        # Method 4: Take everything from the first SELECT to the end of the statement
+        match = _SQL_EXTRACT_RE.search(text)
+        if match:
+            sql_content = match.group(1)
+            logger.info(f"Reconstructed SQL: {sql_content}")
+            return self._clean_sql(sql_content)
         
         # If all else fails, log and return empty
         logger.error(f"Could not parse SQL from response: {text}")
@@ -98,15 +178,11 @@ class ImprovedSQLOutputParser(BaseOutputParser):
     
     def _clean_sql(self, sql: str) -> str:
         """Clean and format SQL query"""
-        # Remove extra whitespace
-        sql = ' '.join(sql.split())
-        
-        # Remove trailing semicolon if present
-        if sql.endswith(';'):
-            sql = sql[:-1]
+        # Collapse whitespace and drop any trailing semicolon
+        sql, starts_with_select, _ = _analyze_sql(sql)
         
         # Ensure it starts with SELECT
-        if not sql.upper().startswith('SELECT'):
+        if not starts_with_select:
             return ""
         
         return sql
@@ -117,11 +193,121 @@ class ImprovedSQLAgent:
             groq_api_key=settings.groq_api_key,
             model_name=settings.chat_model,
             temperature=0.1,
-            max_tokens=1000
+            max_tokens=1000,
+            http_client=httpx.Client(limits=_LLM_HTTP_LIMITS, timeout=_LLM_HTTP_TIMEOUT),
+            http_async_client=httpx.AsyncClient(limits=_LLM_HTTP_LIMITS, timeout=_LLM_HTTP_TIMEOUT)
         )
+        # Async connections belong to the loop that opened them, so every request runs on
+        # this one long-lived loop instead of a fresh asyncio.run loop
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="sql-agent-loop", daemon=True).start()
         self.sql_parser = ImprovedSQLOutputParser()
+        # Tool-calling output puts the SQL in a typed field; the free-text parser is the fallback
+        self.structured_llm = self.llm.with_structured_output(SQLResponse)
         self.graph = self._create_workflow()
-        self.max_refinement_attempts = 2  # Limit refinement attempts
+        self.max_refinement_attempts = settings.max_refinements  # Limit refinement attempts
+        # Graph run configuration, shared by every request
+        self._run_config = {
+            # analyze, generate, validate and execute, plus a refine/validate pair per refinement
+            "recursion_limit": 4 + 2 * self.max_refinement_attempts,
+            "max_execution_time": 60  # 60 seconds timeout
+        }
+        self.response_cache = ResponseCache(self._embed_query)
+        # (normalized query, schema fingerprint) -> (validated SQL, confidence score)
+        self._sql_cache: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        # Same key as the SQL cache -> schema elements retrieved for that query
+        self._schema_cache: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+        # (schema fingerprint, fallback schema context, fallback SQL), built on first use
+        self._fallback = None
+        # Reconnecting or re-inspecting the database makes every cached answer suspect
+        db_manager.add_invalidation_listener(self._on_schema_invalidated)
+    
+    def _on_schema_invalidated(self, connection_name: str):
+        """Drop cached responses, SQL and schema hits when the default connection changes"""
+        if connection_name == "default":
+            self.response_cache.clear()
+            self._sql_cache.clear()
+            self._schema_cache.clear()
+    
+    async def _agenerate_sql(self, messages: List[Tuple[str, str]]) -> str:
+        """Ask the model for SQL through structured output, falling back to parsing free text"""
+        try:
+            response = await self.structured_llm.ainvoke(messages)
+            if response is not None and response.sql:
+                logger.info(f"Structured SQL: {response.sql}")
+                return self.sql_parser._clean_sql(response.sql)
+        except Exception as e:
+            logger.warning(f"Structured SQL generation failed, parsing free text instead: {str(e)}")
+        
+        response_text = await self._astream_sql(messages)
+        logger.info(f"LLM Response: {response_text}")
+        return self.sql_parser.parse(response_text)
+    
+    async def _astream_sql(self, messages: List[Tuple[str, str]]) -> str:
+        """Stream a completion and stop once the first SELECT statement has ended
+        
+        The statement starts at an uppercase SELECT opening a line or code fence and ends
+        at a ';' or a blank line after it. Closing the stream early drops the connection,
+        so the model stops generating the explanation that usually follows.
+        """
+        text = ""
+        sql_start = -1
+        stream = self.llm.astream(messages)
+        try:
+            async for chunk in stream:
+                # Only the new chunk plus a short overlap is scanned, not the whole response
+                scan_from = max(0, len(text) - _STREAM_SCAN_OVERLAP)
+                text += chunk.content
+                if sql_start == -1:
+                    match = _SQL_START_RE.search(text, scan_from)
+                    if match is None:
+                        continue
+                    sql_start = match.start(1)
+                scan_from = max(scan_from, sql_start)
+                
+                if text.find(';', scan_from) != -1 or text.find('\n\n', scan_from) != -1:
+                    break
+        finally:
+            await stream.aclose()
+        
+        return text
+    
+    def _embed_query(self, user_query: str):
+        """Embed a user query with the enhanced semantic layer's model"""
+        return _embed_text(user_query)
+    
+    def _sql_cache_key(self, user_query: str):
+        """Key the SQL cache on the normalized query and the current schema, or None without a schema"""
+        try:
+            return user_query.strip().lower(), db_manager.get_schema_fingerprint()
+        except Exception as e:
+            logger.warning(f"Schema fingerprint unavailable, skipping SQL cache: {str(e)}")
+            return None
+    
+    async def _run_cached_sql(self, initial_state: SQLGenerationState, cached_sql: str,
+                        confidence_score: float):
+        """Execute previously validated SQL without the LLM, or return None if it now fails"""
+        _, _, has_limit = _analyze_sql(cached_sql)
+        initial_state.update(
+            generated_sql=cached_sql,
+            validated_sql=cached_sql,
+            confidence_score=confidence_score,
+            has_limit=has_limit
+        )
+        final_state = await self._execute_sql(initial_state)
+        if final_state.get("error_message"):
+            return None
+        
+        logger.info(f"Reused cached SQL: {cached_sql}")
+        return {
+            "user_query": final_state["user_query"],
+            "generated_sql": cached_sql,
+            "execution_result": final_state["execution_result"],
+            "error_message": "",
+            "confidence_score": confidence_score,
+            "relevant_schema": [],
+            "refinement_attempts": 0
+        }
     
     def _create_workflow(self) -> StateGraph:
         """Create LangGraph workflow for SQL generation"""
@@ -159,17 +345,25 @@ class ImprovedSQLAgent:
             debug=False
         )
     
-    def _analyze_query(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _analyze_query(self, state: SQLGenerationState) -> SQLGenerationState:
         """Analyze user query and find relevant schema elements"""
         try:
             user_query = state["user_query"]
             logger.info(f"Analyzing query: {user_query}")
             
+            # process_query pre-fills the schema for repeated queries
+            if state["relevant_schema"]:
+                logger.info(f"Reusing {len(state['relevant_schema'])} cached schema elements")
+                return state
+            
             # Search for relevant schema elements
-            relevant_schema = enhanced_semantic_layer.search_enhanced_schema(
+            # The response cache lookup already encoded this query; _embed_text returns that vector
+            relevant_schema = await asyncio.to_thread(
+                enhanced_semantic_layer.search_enhanced_schema,
                 user_query, 
                 connection_name="default", 
-                top_k=15
+                top_k=15,
+                embedding=_embed_text(user_query)
             )
             
             state["relevant_schema"] = relevant_schema
@@ -185,7 +379,7 @@ class ImprovedSQLAgent:
         
         return state
     
-    def _generate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _generate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Generate SQL query based on natural language input"""
         try:
             user_query = state["user_query"]
@@ -199,58 +393,26 @@ class ImprovedSQLAgent:
             if not schema_context.strip():
                 logger.warning("No relevant schema found, trying to get basic table info")
                 try:
-                    all_schema = db_manager.get_table_schema()
-                    if all_schema:
-                        # Use first few tables as fallback
-                        fallback_context = ""
-                        for table_name, table_info in list(all_schema.items())[:3]:
-                            fallback_context += f"\nTable: {table_name}\n"
-                            for col in table_info['columns'][:10]:  # First 10 columns
-                                fallback_context += f"  - {col['name']} ({col['type']})\n"
+                    fallback_context, _ = await asyncio.to_thread(self._get_fallback)
+                    if fallback_context:
                         schema_context = fallback_context
                         logger.info(f"Using fallback schema: {schema_context}")
                 except Exception as e:
                     logger.error(f"Failed to get fallback schema: {e}")
             
-            # Create a more explicit prompt
-            system_message = f"""You are a PostgreSQL expert. Convert the user's natural language question into a complete, valid PostgreSQL SQL query.
-
-AVAILABLE TABLES AND COLUMNS:
-{schema_context}
-
-RULES:
-1. Write a complete SQL query starting with SELECT
-2. Only use tables and columns from the schema above
-3. Use proper PostgreSQL syntax
-4. Include appropriate WHERE, GROUP BY, ORDER BY clauses as needed
-5. Return ONLY the SQL query, no explanations
-6. Do not use markdown formatting or code blocks
-7. Make reasonable assumptions if the query is ambiguous
-
-EXAMPLE FORMAT:
-SELECT column1, column2 FROM table1 WHERE condition ORDER BY column1 LIMIT 100"""
-
-            human_message = f"""Question: {user_query}
-
-Write the complete PostgreSQL SQL query:"""
-
-            # Use a simpler approach without the parser in the chain
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                ("human", human_message)
-            ])
-            
-            # Get response from LLM
-            response = self.llm.invoke(prompt.format_messages(user_query=user_query))
-            logger.info(f"LLM Response: {response.content}")
+            state["schema_context"] = schema_context
             
-            # Parse the SQL
-            generated_sql = self.sql_parser.parse(response.content)
+            generated_sql = await self._agenerate_sql([
+                ("system", SYSTEM_TMPL.substitute(schema=schema_context)),
+                ("human", HUMAN_TMPL.substitute(query=user_query))
+            ])
             logger.info(f"Parsed SQL: {generated_sql}")
             
             if not generated_sql:
                 # Try a direct approach
-                generated_sql = self._generate_simple_fallback_query(user_query, schema_context)
+                generated_sql = await asyncio.to_thread(
+                    self._generate_simple_fallback_query, user_query, schema_context
+                )
                 logger.info(f"Using fallback SQL: {generated_sql}")
             
             state["generated_sql"] = generated_sql
@@ -260,7 +422,9 @@ Write the complete PostgreSQL SQL query:"""
             state["error_message"] = f"SQL generation failed: {str(e)}"
             # Try a simple fallback
             try:
-                fallback_sql = self._generate_simple_fallback_query(state["user_query"], "")
+                fallback_sql = await asyncio.to_thread(
+                    self._generate_simple_fallback_query, state["user_query"], ""
+                )
                 state["generated_sql"] = fallback_sql
                 logger.info(f"Using emergency fallback: {fallback_sql}")
             except:
@@ -268,23 +432,33 @@ Write the complete PostgreSQL SQL query:"""
         
         return state
     
+    def _get_fallback(self) -> Tuple[str, str]:
+        """Return (schema context, query) built from the first tables, cached until the schema changes"""
+        fingerprint = db_manager.get_schema_fingerprint()
+        if self._fallback is None or self._fallback[0] != fingerprint:
+            # Use first few tables as fallback, first 10 columns each
+            first_tables = list(islice(db_manager.get_table_schema().items(), 3))
+            fallback_context = "".join(
+                f"\nTable: {table_name}\n" + "".join(f"  - {col['name']} ({col['type']})\n" for col in islice(table_info['columns'], 10))
+                for table_name, table_info in first_tables
+            )
+            
+            # Simple SELECT over the first few columns of the first table
+            if first_tables:
+                first_table, first_table_info = first_tables[0]
+                columns = [col['name'] for col in islice(first_table_info['columns'], 5)]
+                fallback_sql = f"SELECT {', '.join(columns)} FROM {first_table} LIMIT 10"
+            else:
+                fallback_sql = "SELECT 1 as test_query"
+            
+            self._fallback = (fingerprint, fallback_context, fallback_sql)
+        
+        return self._fallback[1], self._fallback[2]
+    
     def _generate_simple_fallback_query(self, user_query: str, schema_context: str) -> str:
         """Generate a simple fallback query when main generation fails"""
         try:
-            # Get available tables
-            all_schema = db_manager.get_table_schema()
-            if not all_schema:
-                return "SELECT 1 as test_query"
-            
-            # Use the first table as fallback
-            first_table = list(all_schema.keys())[0]
-            first_table_info = all_schema[first_table]
-            
-            # Get first few columns
-            columns = [col['name'] for col in first_table_info['columns'][:5]]
-            
-            # Create a simple SELECT query
-            fallback_sql = f"SELECT {', '.join(columns)} FROM {first_table} LIMIT 10"
+            _, fallback_sql = self._get_fallback()
             logger.info(f"Generated fallback query: {fallback_sql}")
             return fallback_sql
             
@@ -292,7 +466,7 @@ Write the complete PostgreSQL SQL query:"""
             logger.error(f"Fallback generation failed: {e}")
             return "SELECT 1 as test_query"
     
-    def _validate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _validate_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Validate the generated SQL query"""
         try:
             generated_sql = state["generated_sql"]
@@ -303,31 +477,31 @@ Write the complete PostgreSQL SQL query:"""
                 return state
             
             # Basic SQL syntax validation
-            sql_lower = generated_sql.lower().strip()
+            _, starts_with_select, has_limit = _analyze_sql(generated_sql)
+            state["has_limit"] = has_limit
             
             # Check for basic SQL structure
-            if not sql_lower.startswith('select'):
+            if not starts_with_select:
                 state["error_message"] = "Query must start with SELECT"
                 return state
             
             # Check for potential SQL injection patterns
-            dangerous_patterns = ['drop', 'delete', 'truncate', 'alter', 'create', 'insert', 'update']
-            for pattern in dangerous_patterns:
-                if pattern in sql_lower:
-                    state["error_message"] = f"Potentially dangerous SQL operation detected: {pattern}"
-                    return state
+            # Only reached for SELECT statements; one scan of the original string
+            dangerous_match = _DANGEROUS_SQL_RE.search(generated_sql)
+            if dangerous_match:
+                state["error_message"] = f"Potentially dangerous SQL operation detected: {dangerous_match.group(0).lower()}"
+                return state
             
             # Try to validate with database (dry run)
             try:
-                # Add LIMIT to prevent large result sets during validation
-                validation_sql = generated_sql
-                if 'limit' not in sql_lower and 'top' not in sql_lower:
-                    validation_sql += " LIMIT 1"
+                # EXPLAIN parses and plans the query without reading any rows
+                validation_sql = f"EXPLAIN {generated_sql}"
                 
                 logger.info(f"Testing query: {validation_sql}")
-                # Test query execution
-                test_result = db_manager.execute_query(validation_sql)
-                logger.info(f"Validation successful, got {len(test_result)} rows")
+                await asyncio.to_thread(
+                    db_manager.execute_query, validation_sql, timeout_ms=settings.validation_timeout_ms
+                )
+                logger.info("Validation successful")
                 
                 state["validated_sql"] = generated_sql
                 state["confidence_score"] = 0.9
@@ -343,18 +517,19 @@ Write the complete PostgreSQL SQL query:"""
         
         return state
     
-    def _execute_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _execute_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Execute the validated SQL query"""
         try:
             validated_sql = state["validated_sql"]
             logger.info(f"Executing SQL: {validated_sql}")
             
             # Add safety limit if not present
-            sql_lower = validated_sql.lower()
-            if 'limit' not in sql_lower and 'top' not in sql_lower:
+            if not state.get("has_limit", False):
                 validated_sql += f" LIMIT {settings.max_query_results}"
             
-            result = db_manager.execute_query(validated_sql)
+            result = await asyncio.to_thread(
+                db_manager.execute_query, validated_sql, timeout_ms=settings.query_timeout_ms
+            )
             state["execution_result"] = result
             logger.info(f"SQL executed successfully, returned {len(result)} rows")
             
@@ -364,7 +539,7 @@ Write the complete PostgreSQL SQL query:"""
         
         return state
     
-    def _refine_sql(self, state: SQLGenerationState) -> SQLGenerationState:
+    async def _refine_sql(self, state: SQLGenerationState) -> SQLGenerationState:
         """Refine SQL query based on validation errors"""
         try:
             # Increment refinement attempts
@@ -376,24 +551,16 @@ Write the complete PostgreSQL SQL query:"""
             user_query = state["user_query"]
             generated_sql = state["generated_sql"]
             error_message = state["error_message"]
-            relevant_schema = state["relevant_schema"]
+            schema_context = state.get("schema_context") or self._format_schema_context(state["relevant_schema"])
             
-            schema_context = self._format_schema_context(relevant_schema)
+            refine_prompt = REFINE_TMPL.substitute(
+                query=user_query,
+                sql=generated_sql,
+                error=error_message,
+                schema=schema_context
+            )
             
-            refine_prompt = f"""The previous SQL query had an error. Please fix it.
-
-Original Query Request: {user_query}
-Previous SQL: {generated_sql}
-Error: {error_message}
-
-Schema Information:
-{schema_context}
-
-Please generate a corrected PostgreSQL SQL query that addresses the error while fulfilling the original request.
-Return only the corrected SQL query without any formatting or explanations."""
-
-            response = self.llm.invoke([("human", refine_prompt)])
-            refined_sql = self.sql_parser.parse(response.content)
+            refined_sql = await self._agenerate_sql([("human", refine_prompt)])
             
             if refined_sql and refined_sql != generated_sql:
                 state["generated_sql"] = refined_sql
@@ -432,43 +599,31 @@ Return only the corrected SQL query without any formatting or explanations."""
     
     def _format_schema_context(self, relevant_schema: List[Dict]) -> str:
         """Format schema information for the prompt"""
-        if not relevant_schema:
-            return ""
-        
-        context = ""
-        tables_seen = set()
-        
-        # Group by table
-        table_info = {}
-        for item in relevant_schema:
-            metadata = item.get("metadata", {})
-            if metadata.get("type") == "table":
-                table_name = metadata.get("table")
-                if table_name and table_name not in tables_seen:
-                    table_info[table_name] = []
-                    tables_seen.add(table_name)
-            elif metadata.get("type") == "column":
-                table_name = metadata.get("table")
-                column_name = metadata.get("column")
-                data_type = metadata.get("data_type", "")
-                if table_name and column_name:
-                    if table_name not in table_info:
-                        table_info[table_name] = []
-                    table_info[table_name].append(f"{column_name} ({data_type})")
-        
-        # Format the context
-        for table_name, columns in table_info.items():
-            context += f"\nTable: {table_name}\n"
-            for column in columns[:10]:  # Limit columns to prevent prompt overflow
-                context += f"  - {column}\n"
-        
-        return context
+        schema_items = tuple(
+            (
+                item.get("metadata", {}).get("type", ""),
+                item.get("metadata", {}).get("table", ""),
+                item.get("metadata", {}).get("column", ""),
+                item.get("metadata", {}).get("data_type", "")
+            )
+            for item in relevant_schema
+        )
+        return _build_schema_context(schema_items)
     
-    def process_query(self, user_query: str) -> Dict[str, Any]:
+    async def aprocess_query(self, user_query: str) -> Dict[str, Any]:
         """Process natural language query and return results"""
         try:
             logger.info(f"Processing query: {user_query}")
             
+            # Cached entries are keyed by the schema fingerprint, so another database never answers
+            sql_cache_key = await asyncio.to_thread(self._sql_cache_key, user_query)
+            cache_scope = sql_cache_key[1] if sql_cache_key is not None else ""
+            
+            # Repeated and paraphrased questions skip the LLM and the database
+            cached = self.response_cache.get(user_query, cache_scope)
+            if cached is not None:
+                return cached
+            
             initial_state = SQLGenerationState(
                 user_query=user_query,
                 relevant_schema=[],
@@ -477,22 +632,38 @@ Return only the corrected SQL query without any formatting or explanations."""
                 execution_result=None,
                 error_message="",
                 confidence_score=0.0,
-                refinement_attempts=0  # Initialize refinement attempts
+                refinement_attempts=0,  # Initialize refinement attempts
+                has_limit=False,
+                schema_context=""
             )
             
-            # Configure recursion limit for the graph execution
-            config = {
-                "recursion_limit": 10,  # Set a reasonable limit
-                "max_execution_time": 60  # 60 seconds timeout
-            }
+            # Exact repeats against the same schema reuse the validated SQL
+            if sql_cache_key in self._sql_cache:
+                self._sql_cache.move_to_end(sql_cache_key)
+                result = await self._run_cached_sql(dict(initial_state), *self._sql_cache[sql_cache_key])
+                if result is not None:
+                    return result
+                del self._sql_cache[sql_cache_key]
+            
+            if sql_cache_key in self._schema_cache:
+                self._schema_cache.move_to_end(sql_cache_key)
+                initial_state["relevant_schema"] = self._schema_cache[sql_cache_key]
             
+            # Streamed so the fallback can reuse the schema the run already retrieved
+            final_state = initial_state
             try:
-                final_state = self.graph.invoke(initial_state, config=config)
+                async for final_state in self.graph.astream(initial_state, config=self._run_config,
+                                                            stream_mode="values"):
+                    pass
             except Exception as graph_error:
                 if "recursion limit" in str(graph_error).lower():
                     logger.error("Recursion limit reached, falling back to simple SQL generation")
-                    # Fallback: try simple SQL generation without refinement
-                    return self._fallback_simple_generation(user_query)
+                    # Fallback: try simple SQL generation without refinement, reusing the retrieved schema
+                    result = await self._fallback_simple_generation(user_query, final_state.get("relevant_schema"))
+                    # Cache it so retries of the same query do not hit the fallback again
+                    if result["confidence_score"] >= _MIN_CACHE_CONFIDENCE:
+                        self.response_cache.put(user_query, result, cache_scope)
+                    return result
                 else:
                     raise graph_error
             
@@ -507,6 +678,18 @@ Return only the corrected SQL query without any formatting or explanations."""
             }
             
             logger.info(f"Query processing completed. SQL: {result['generated_sql']}")
+            if result["confidence_score"] >= _MIN_CACHE_CONFIDENCE:
+                self.response_cache.put(user_query, result, cache_scope)
+            if sql_cache_key is not None and final_state.get("validated_sql") and not result["error_message"]:
+                self._sql_cache[sql_cache_key] = (final_state["validated_sql"], result["confidence_score"])
+                self._sql_cache.move_to_end(sql_cache_key)
+                if len(self._sql_cache) > _SQL_CACHE_SIZE:
+                    self._sql_cache.popitem(last=False)
+            if sql_cache_key is not None and final_state.get("relevant_schema"):
+                self._schema_cache[sql_cache_key] = final_state["relevant_schema"]
+                self._schema_cache.move_to_end(sql_cache_key)
+                if len(self._schema_cache) > _SCHEMA_CACHE_SIZE:
+                    self._schema_cache.popitem(last=False)
             return result
             
         except Exception as e:
@@ -521,42 +704,41 @@ Return only the corrected SQL query without any formatting or explanations."""
                 "refinement_attempts": 0
             }
     
-    def _fallback_simple_generation(self, user_query: str) -> Dict[str, Any]:
-        """Fallback method for simple SQL generation without workflow"""
+    def process_query(self, user_query: str) -> Dict[str, Any]:
+        """Synchronous wrapper around aprocess_query"""
+        return asyncio.run_coroutine_threadsafe(self.aprocess_query(user_query), self._loop).result()
+    
+    async def _fallback_simple_generation(self, user_query: str,
+                                          relevant_schema: List[Dict] = None) -> Dict[str, Any]:
+        """Fallback method for simple SQL generation without workflow
+        
+        relevant_schema, when already retrieved for this query, skips the semantic search.
+        """
         try:
             logger.info("Using fallback simple SQL generation")
             
             # Get relevant schema
-            relevant_schema = enhanced_semantic_layer.search_enhanced_schema(
-                user_query, connection_name="default", top_k=10
-            )
+            if not relevant_schema:
+                relevant_schema = await asyncio.to_thread(
+                    enhanced_semantic_layer.search_enhanced_schema,
+                    user_query, connection_name="default", top_k=10,
+                    embedding=_embed_text(user_query)
+                )
             
             # Generate SQL directly
             schema_context = self._format_schema_context(relevant_schema)
             
-            system_message = f"""You are a PostgreSQL expert. Convert the user's natural language question into a complete, valid PostgreSQL SQL query.
-
-AVAILABLE TABLES AND COLUMNS:
-{schema_context}
-
-RULES:
-1. Write a complete SQL query starting with SELECT
-2. Only use tables and columns from the schema above
-3. Use proper PostgreSQL syntax
-4. Return ONLY the SQL query, no explanations
-5. Do not use markdown formatting"""
-
-            response = self.llm.invoke([
-                ("system", system_message),
-                ("human", f"Question: {user_query}\n\nWrite the complete PostgreSQL SQL query:")
+            generated_sql = await self._agenerate_sql([
+                ("system", SYSTEM_TMPL.substitute(schema=schema_context)),
+                ("human", HUMAN_TMPL.substitute(query=user_query))
             ])
             
-            generated_sql = self.sql_parser.parse(response.content)
-            
             if generated_sql:
                 # Try to execute it
                 try:
-                    result_df = db_manager.execute_query(generated_sql + " LIMIT 1000")
+                    result_df = await asyncio.to_thread(
+                        db_manager.execute_query, generated_sql + " LIMIT 1000", timeout_ms=settings.query_timeout_ms
+                    )
                     return {
                         "user_query": user_query,
                         "generated_sql": generated_sql,
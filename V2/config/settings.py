@@ -1,42 +1,56 @@
-import os
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
-from typing import Optional
-
-load_dotenv()
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
+    # Each field is read once by pydantic-settings: environment variables first, then .env
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    
     # Groq Configuration
-    groq_api_key: str = os.getenv("GROQ_API_KEY", "")
+    groq_api_key: str = ""
     
     # Database Configurations
-    postgres_host: str = os.getenv("POSTGRES_HOST", "localhost")
-    postgres_port: int = int(os.getenv("POSTGRES_PORT", "5432"))
-    postgres_db: str = os.getenv("POSTGRES_DB", "")
-    postgres_user: str = os.getenv("POSTGRES_USER", "")
-    postgres_password: str = os.getenv("POSTGRES_PASSWORD", "")
+    postgres_host: str = "localhost"
+    postgres_port: int = 5432
+    postgres_db: str = ""
+    postgres_user: str = ""
+    postgres_password: str = ""
     
-    mysql_host: str = os.getenv("MYSQL_HOST", "localhost")
-    mysql_port: int = int(os.getenv("MYSQL_PORT", "3306"))
-    mysql_db: str = os.getenv("MYSQL_DB", "")
-    mysql_user: str = os.getenv("MYSQL_USER", "")
-    mysql_password: str = os.getenv("MYSQL_PASSWORD", "")
+    mysql_host: str = "localhost"
+    mysql_port: int = 3306
+    mysql_db: str = ""
+    mysql_user: str = ""
+    mysql_password: str = ""
     
-    oracle_host: str = os.getenv("ORACLE_HOST", "localhost")
-    oracle_port: int = int(os.getenv("ORACLE_PORT", "1521"))
-    oracle_service: str = os.getenv("ORACLE_SERVICE", "")
-    oracle_user: str = os.getenv("ORACLE_USER", "")
-    oracle_password: str = os.getenv("ORACLE_PASSWORD", "")
+    oracle_host: str = "localhost"
+    oracle_port: int = 1521
+    oracle_service: str = ""
+    oracle_user: str = ""
+    oracle_password: str = ""
     
     # Vector Database
-    chroma_persist_directory: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+    chroma_persist_directory: str = "./chroma_db"
+    vector_backend: Literal["chroma", "faiss"] = "chroma"
+    hnsw_m: int = 32
+    hnsw_construction_ef: int = 200
+    hnsw_search_ef: int = 64
     
     # Application Settings
     max_query_results: int = 10000
+    query_timeout_ms: int = 30000
+    validation_timeout_ms: int = 2000
     embedding_model: str = "all-MiniLM-L6-v2"
     chat_model: str = "openai/gpt-oss-120b"
+    validate_with_explain: bool = False
+    max_refinements: int = 2
+    schema_top_k_tables: int = 5
+    schema_top_k_columns: int = 20
+    schema_cache_ttl: int = 3600  # seconds before db_manager re-inspects the schema
     
-    class Config:
-        env_file = ".env"
+    # Response Cache
+    response_cache_size: int = 256
+    response_cache_ttl: int = 600  # seconds a cached query result is served before the query re-runs
+    semantic_cache_threshold: float = 0.95
+    speculative_schema_threshold: float = 0.9
+    schema_cache_size: int = 512
 
 settings = Settings()
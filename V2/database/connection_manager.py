@@ -1,46 +1,89 @@
 from sqlalchemy import create_engine, text, MetaData, inspect
+from sqlalchemy.engine import URL
 from sqlalchemy.orm import sessionmaker
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Callable, Optional
+import hashlib
+import json
+import time
 import pandas as pd
 from config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+SQL_DRIVERS = {
+    'postgresql': 'postgresql',
+    'mysql': 'mysql+pymysql',
+    'oracle': 'oracle+cx_oracle'
+}
+
 class DatabaseConnectionManager:
     def __init__(self):
         self.engines = {}
         self.sessions = {}
         self.metadata_cache = {}
+        self.metadata_cache_times = {}
+        self.db_types = {}
+        self.schema_fingerprints = {}
+        self.invalidation_listeners: List[Callable[[str], None]] = []
     
-    def get_connection_string(self, db_type: str, **kwargs) -> str:
-        """Generate connection string based on database type"""
-        if db_type.lower() == 'postgresql':
-            return f"postgresql://{settings.postgres_user}:{settings.postgres_password}@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
-        elif db_type.lower() == 'mysql':
-            return f"mysql+pymysql://{settings.mysql_user}:{settings.mysql_password}@{settings.mysql_host}:{settings.mysql_port}/{settings.mysql_db}"
-        elif db_type.lower() == 'oracle':
-            return f"oracle+cx_oracle://{settings.oracle_user}:{settings.oracle_password}@{settings.oracle_host}:{settings.oracle_port}/{settings.oracle_service}"
+    def get_connection_string(self, db_type: str, **overrides) -> URL:
+        """Generate connection URL based on database type
+        
+        host, port, database (or service for Oracle), username and password in
+        overrides take precedence over the configured settings, which are never modified.
+        """
+        db_type = db_type.lower()
+        if db_type == 'postgresql':
+            defaults = (settings.postgres_host, settings.postgres_port, settings.postgres_db,
+                        settings.postgres_user, settings.postgres_password)
+        elif db_type == 'mysql':
+            defaults = (settings.mysql_host, settings.mysql_port, settings.mysql_db,
+                        settings.mysql_user, settings.mysql_password)
+        elif db_type == 'oracle':
+            defaults = (settings.oracle_host, settings.oracle_port, settings.oracle_service,
+                        settings.oracle_user, settings.oracle_password)
         else:
             raise ValueError(f"Unsupported database type: {db_type}")
+        
+        host, port, database, username, password = defaults
+        return URL.create(
+            SQL_DRIVERS[db_type],
+            username=overrides.get('username', username),
+            password=overrides.get('password', password),
+            host=overrides.get('host', host),
+            port=int(overrides.get('port', port)),
+            database=overrides.get('database', overrides.get('service', database))
+        )
     
-    def connect(self, db_type: str, connection_name: str = "default") -> bool:
-        """Establish database connection"""
+    @staticmethod
+    def build_engine(connection_string) -> Any:
+        """Create a pooled SQLAlchemy engine for a connection string or URL"""
+        return create_engine(
+            connection_string,
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,
+            pool_recycle=3600
+        )
+    
+    def connect(self, db_type: str, connection_name: str = "default", engine: Any = None, **overrides) -> bool:
+        """Establish database connection
+        
+        Reuses `engine` when one is supplied, otherwise builds one from settings
+        and any connection overrides accepted by get_connection_string.
+        """
         try:
-            connection_string = self.get_connection_string(db_type)
-            engine = create_engine(
-                connection_string,
-                pool_size=10,
-                max_overflow=20,
-                pool_pre_ping=True,
-                pool_recycle=3600
-            )
+            if engine is None:
+                engine = self.build_engine(self.get_connection_string(db_type, **overrides))
             
             # Test connection
             with engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             
             self.engines[connection_name] = engine
+            self.db_types[connection_name] = db_type.lower()
+            self.invalidate_schema(connection_name)
             Session = sessionmaker(bind=engine)
             self.sessions[connection_name] = Session()
             
@@ -51,18 +94,54 @@ class DatabaseConnectionManager:
             logger.error(f"Failed to connect to {db_type}: {str(e)}")
             return False
     
-    def execute_query(self, query: str, connection_name: str = "default") -> pd.DataFrame:
-        """Execute SQL query and return results as DataFrame"""
+    def execute_query(self, query: str, connection_name: str = "default",
+                      timeout_ms: Optional[int] = None) -> pd.DataFrame:
+        """Execute SQL query and return results as DataFrame
+        
+        On PostgreSQL, timeout_ms bounds the query server-side with SET LOCAL statement_timeout,
+        and a cancelled query raises TimeoutError.
+        """
         try:
             if connection_name not in self.engines:
                 raise ValueError(f"No connection found for {connection_name}")
             
             with self.engines[connection_name].connect() as conn:
-                result = pd.read_sql(query, conn)
+                if timeout_ms and self.db_types.get(connection_name) == 'postgresql':
+                    # SET LOCAL only lasts for this transaction, so the pooled connection is unaffected
+                    with conn.begin():
+                        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+                        result = pd.read_sql(query, conn)
+                else:
+                    result = pd.read_sql(query, conn)
                 
             logger.info(f"Query executed successfully, returned {len(result)} rows")
             return result
             
+        except Exception as e:
+            # 57014 is PostgreSQL's query_canceled, raised when statement_timeout fires
+            if getattr(getattr(e, 'orig', None), 'pgcode', None) == '57014':
+                logger.error(f"Query exceeded time budget of {timeout_ms} ms")
+                raise TimeoutError(f"Query exceeded time budget of {timeout_ms} ms") from e
+            logger.error(f"Query execution failed: {str(e)}")
+            raise
+    
+    def execute_query_stream(self, query: str, limit: int, connection_name: str = "default") -> pd.DataFrame:
+        """Execute SQL query through a server-side cursor and fetch at most `limit` rows"""
+        try:
+            if connection_name not in self.engines:
+                raise ValueError(f"No connection found for {connection_name}")
+            
+            with self.engines[connection_name].connect() as conn:
+                # Sent to the driver verbatim: text() would read ':30' or '::int' as bind parameters, and
+                # no_parameters keeps psycopg2 and pymysql from treating '%' in LIKE patterns as placeholders
+                result = conn.execution_options(stream_results=True, no_parameters=True).exec_driver_sql(query)
+                rows = result.fetchmany(limit)
+                df = pd.DataFrame(rows, columns=list(result.keys()))
+                result.close()
+            
+            logger.info(f"Query executed successfully, fetched {len(df)} rows")
+            return df
+            
         except Exception as e:
             logger.error(f"Query execution failed: {str(e)}")
             raise
@@ -74,7 +153,10 @@ class DatabaseConnectionManager:
                 raise ValueError(f"No connection found for {connection_name}")
             
             if connection_name in self.metadata_cache:
-                return self.metadata_cache[connection_name]
+                if time.monotonic() - self.metadata_cache_times[connection_name] < settings.schema_cache_ttl:
+                    return self.metadata_cache[connection_name]
+                # Expired: re-inspect so DDL changes are eventually picked up
+                self.invalidate_schema(connection_name)
             
             inspector = inspect(self.engines[connection_name])
             schema_info = {}
@@ -155,6 +237,7 @@ class DatabaseConnectionManager:
                     continue
             
             self.metadata_cache[connection_name] = schema_info
+            self.metadata_cache_times[connection_name] = time.monotonic()
             logger.info(f"Successfully cached schema for {len(schema_info)} actual tables")
             return schema_info
             
@@ -162,6 +245,32 @@ class DatabaseConnectionManager:
             logger.error(f"Failed to get schema: {str(e)}")
             raise
     
+    def get_schema_fingerprint(self, connection_name: str = "default") -> str:
+        """Return a short hash of the connection's table names, cached until the schema is invalidated"""
+        # Goes through get_table_schema first so an expired schema also drops its fingerprint
+        schema_info = self.get_table_schema(connection_name)
+        if connection_name not in self.schema_fingerprints:
+            table_names = sorted(schema_info.keys())
+            self.schema_fingerprints[connection_name] = hashlib.blake2b(
+                json.dumps(table_names).encode(), digest_size=8
+            ).hexdigest()
+        return self.schema_fingerprints[connection_name]
+    
+    def add_invalidation_listener(self, listener: Callable[[str], None]):
+        """Call listener(connection_name) whenever a connection's schema is invalidated or reconnected"""
+        self.invalidation_listeners.append(listener)
+    
+    def invalidate_schema(self, connection_name: str = "default"):
+        """Drop cached schema information so the next lookup re-inspects the database"""
+        self.metadata_cache.pop(connection_name, None)
+        self.metadata_cache_times.pop(connection_name, None)
+        self.schema_fingerprints.pop(connection_name, None)
+        for listener in self.invalidation_listeners:
+            try:
+                listener(connection_name)
+            except Exception as e:
+                logger.warning(f"Schema invalidation listener failed: {str(e)}")
+    
     def get_sample_data(self, table_name: str, limit: int = 5, connection_name: str = "default") -> pd.DataFrame:
         """Get sample data from a table"""
         try:
@@ -173,6 +282,8 @@ class DatabaseConnectionManager:
     
     def close_connections(self):
         """Close all database connections"""
+        for connection_name in list(self.engines):
+            self.invalidate_schema(connection_name)
         for session in self.sessions.values():
             session.close()
         for engine in self.engines.values():
@@ -180,6 +291,10 @@ class DatabaseConnectionManager:
         
         self.engines.clear()
         self.sessions.clear()
+        self.db_types.clear()
+        self.metadata_cache.clear()
+        self.metadata_cache_times.clear()
+        self.schema_fingerprints.clear()
         logger.info("All database connections closed")
 
 # Global instance
@@ -4,6 +4,7 @@ from typing import Dict, List, Any, Optional
 import logging
 from config.settings import settings
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeDeserializer
 import json
 
 logger = logging.getLogger(__name__)
@@ -16,17 +17,21 @@ class NoSQLConnectionManager:
         self.s3_client = None
         self.connections = {}
     
-    def connect_dynamodb(self, region_name: str = "us-east-1", **kwargs) -> bool:
-        """Connect to DynamoDB"""
+    def connect_dynamodb(self, region_name: str = "us-east-1", client: Any = None,
+                         resource: Any = None, **kwargs) -> bool:
+        """Connect to DynamoDB, reusing `client` and `resource` when both are supplied"""
         try:
-            session = boto3.Session(
-                aws_access_key_id=kwargs.get('aws_access_key_id'),
-                aws_secret_access_key=kwargs.get('aws_secret_access_key'),
-                region_name=region_name
-            )
+            if client is None or resource is None:
+                session = boto3.Session(
+                    aws_access_key_id=kwargs.get('aws_access_key_id'),
+                    aws_secret_access_key=kwargs.get('aws_secret_access_key'),
+                    region_name=region_name
+                )
+                client = session.client('dynamodb')
+                resource = session.resource('dynamodb')
             
-            self.dynamodb_client = session.client('dynamodb')
-            self.dynamodb_resource = session.resource('dynamodb')
+            self.dynamodb_client = client
+            self.dynamodb_resource = resource
             
             # Test connection
             self.dynamodb_client.list_tables()
@@ -44,17 +49,21 @@ class NoSQLConnectionManager:
             logger.error(f"Failed to connect to DynamoDB: {str(e)}")
             return False
     
-    def connect_athena(self, region_name: str = "us-east-1", s3_output_location: str = None, **kwargs) -> bool:
-        """Connect to Athena"""
+    def connect_athena(self, region_name: str = "us-east-1", s3_output_location: str = None,
+                       client: Any = None, s3_client: Any = None, **kwargs) -> bool:
+        """Connect to Athena, reusing `client` and `s3_client` when both are supplied"""
         try:
-            session = boto3.Session(
-                aws_access_key_id=kwargs.get('aws_access_key_id'),
-                aws_secret_access_key=kwargs.get('aws_secret_access_key'),
-                region_name=region_name
-            )
+            if client is None or s3_client is None:
+                session = boto3.Session(
+                    aws_access_key_id=kwargs.get('aws_access_key_id'),
+                    aws_secret_access_key=kwargs.get('aws_secret_access_key'),
+                    region_name=region_name
+                )
+                client = session.client('athena')
+                s3_client = session.client('s3')
             
-            self.athena_client = session.client('athena')
-            self.s3_client = session.client('s3')
+            self.athena_client = client
+            self.s3_client = s3_client
             
             # Test connection
             self.athena_client.list_databases(CatalogName='AwsDataCatalog')
@@ -100,10 +109,12 @@ class NoSQLConnectionManager:
             attributes = {attr['AttributeName']: attr['AttributeType'] 
                          for attr in table_info.get('AttributeDefinitions', [])}
             
-            # Sample some items to understand structure
-            table = self.dynamodb_resource.Table(table_name)
-            sample_response = table.scan(Limit=5)
-            sample_items = sample_response.get('Items', [])
+            # Sample some items to understand structure. This goes through the client rather
+            # than the resource because clients are thread-safe and tables are described concurrently
+            sample_response = self.dynamodb_client.scan(TableName=table_name, Limit=5)
+            deserializer = TypeDeserializer()
+            sample_items = [{k: deserializer.deserialize(v) for k, v in item.items()}
+                            for item in sample_response.get('Items', [])]
             
             # Infer additional attributes from sample data
             all_attributes = set(attributes.keys())
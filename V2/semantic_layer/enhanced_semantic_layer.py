@@ -1,8 +1,10 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
+from chromadb.errors import NotFoundError
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any, Optional, Tuple
 import json
+import numpy as np
 import pandas as pd
 import logging
 from config.settings import settings
@@ -49,9 +51,10 @@ class EnhancedSemanticLayer:
             collection_name = f"enhanced_schema_{connection_name}"
             
             # Delete existing collection if it exists
+            # Only a missing collection is expected; lock or I/O errors fail the ingest
             try:
                 self.client.delete_collection(collection_name)
-            except:
+            except (NotFoundError, ValueError):
                 pass
             
             collection = self.client.create_collection(
@@ -138,8 +141,10 @@ class EnhancedSemanticLayer:
                 batch_metas = metadatas[i:i+batch_size]
                 batch_ids = ids[i:i+batch_size]
                 
+                # Embedded with the layer's own model so search_enhanced_schema can take query vectors from it
                 collection.add(
                     documents=batch_docs,
+                    embeddings=self.embedding_model.encode(batch_docs, normalize_embeddings=True).tolist(),
                     metadatas=batch_metas,
                     ids=batch_ids
                 )
@@ -421,17 +426,24 @@ class EnhancedSemanticLayer:
                 "business_rules": ""
             }
     
-    def search_enhanced_schema(self, query: str, connection_name: str = "default", top_k: int = 15) -> List[Dict]:
-        """Search enhanced schema with better context understanding"""
+    def search_enhanced_schema(self, query: str, connection_name: str = "default", top_k: int = 15,
+                               embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Search enhanced schema with better context understanding
+        
+        embedding, when the caller already encoded the query with embedding_model, skips a second encoder pass.
+        """
         try:
             collection_name = f"enhanced_schema_{connection_name}"
             
             if connection_name not in self.collections:
                 self.collections[connection_name] = self.client.get_collection(collection_name)
             
+            if embedding is None:
+                embedding = self.embedding_model.encode([query], normalize_embeddings=True)[0]
+            
             # Search with multiple strategies
             results = self.collections[connection_name].query(
-                query_texts=[query],
+                query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
                 n_results=top_k,
                 include=['documents', 'metadatas', 'distances']
             )
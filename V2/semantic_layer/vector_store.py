@@ -1,175 +1,421 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, FrozenSet, Union
+from collections import OrderedDict, defaultdict
+from functools import cached_property
+import atexit
+import dbm
+import hashlib
 import json
 import logging
+import os
+import shelve
+import threading
+import faiss
+import numpy as np
+import pandas as pd
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+_CHROMA_SETTINGS = ChromaSettings(anonymized_telemetry=False)
+
+# Documents per collection.add call; each call is one Chroma write transaction
+CHROMA_BATCH_SIZE = 250
+
+# Micro-batch size for the single encode call per ingest; the model sorts documents by length itself
+EMBEDDING_BATCH_SIZE = 256
+
+# Document embeddings kept on disk; past this, entries the current ingest doesn't use are evicted
+EMBEDDING_CACHE_SIZE = 50000
+
+# Query embeddings kept in memory for repeated dashboard questions
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+# Embeddings are L2-normalized, so inner product ranks exactly like cosine without the norms.
+# hnswlib reports ip distance as 1 - dot, so similarity is still 1 - distance.
+# Schemas stay well under 10k vectors, so a denser graph and wider search cost little memory.
+# Chroma's HNSW index only stores float32 vectors; the FAISS backend below stores them as int8.
+COLLECTION_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:M": settings.hnsw_m,
+    "hnsw:construction_ef": settings.hnsw_construction_ef,
+    "hnsw:search_ef": settings.hnsw_search_ef,
+}
+
 class SemanticLayer:
     def __init__(self):
-        self.client = chromadb.PersistentClient(
+        # The Chroma client, embedding model and embedding cache are created on first use,
+        # so importing this module doesn't load torch or open the persist directory
+        self.collections = {}
+        self.schema_entities: Dict[str, FrozenSet[str]] = {}
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Streamlit session threads and the agents' loop threads share both caches
+        self._query_lock = threading.Lock()
+        self._emb_cache_lock = threading.Lock()
+    
+    @cached_property
+    def client(self):
+        client = chromadb.PersistentClient(
             path=settings.chroma_persist_directory,
-            settings=ChromaSettings(anonymized_telemetry=False)
+            settings=_CHROMA_SETTINGS
         )
-        self.embedding_model = SentenceTransformer(settings.embedding_model)
-        self.collections = {}
+        self._warm_collections(client)
+        return client
+    
+    def _warm_collections(self, client):
+        """Open every existing schema collection up front so the first search skips the lookup"""
+        try:
+            for collection in client.list_collections():
+                # Newer chromadb versions list names, older ones Collection objects
+                name = getattr(collection, "name", collection)
+                if name.startswith("schema_"):
+                    self.collections.setdefault(name[len("schema_"):], client.get_collection(name))
+        except Exception as e:
+            logger.warning(f"Failed to warm Chroma collections: {str(e)}")
+    
+    @cached_property
+    def embedding_model(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = SentenceTransformer(settings.embedding_model, device=device)
+        if device == "cuda":
+            # fp16 halves weight and activation bandwidth on the GPU
+            model = model.half()
+        return model
+    
+    @cached_property
+    def _emb_cache(self):
+        """Persistent embedding cache keyed by (model, text) so schema refreshes only embed changed documents
+        
+        Another process holding the dbm lock leaves this process with an in-memory cache instead.
+        """
+        os.makedirs(settings.chroma_persist_directory, exist_ok=True)
+        try:
+            cache = shelve.open(os.path.join(settings.chroma_persist_directory, "emb_cache"))
+        except dbm.error as e:
+            logger.warning(f"Embedding cache unavailable, caching in memory: {str(e)}")
+            return {}
+        atexit.register(cache.close)
+        return cache
+    
+    def _evict_embeddings(self, keys: List[str]):
+        """Keep the cache under EMBEDDING_CACHE_SIZE by dropping entries not in keys"""
+        if len(self._emb_cache) <= EMBEDDING_CACHE_SIZE:
+            return
+        keep = set(keys)
+        stale = [key for key in self._emb_cache.keys() if key not in keep]
+        for key in stale:
+            del self._emb_cache[key]
+        logger.info(f"Evicted {len(stale)} cached embeddings")
+    
+    @staticmethod
+    def _embedding_key(document: str) -> str:
+        return hashlib.blake2b(f"{settings.embedding_model}|{document}".encode(), digest_size=16).hexdigest()
+    
+    def _find_uncached_texts(self, keys: List[str], documents: List[str]) -> Dict[str, str]:
+        """Return the documents whose embeddings are not cached yet, keyed by cache key"""
+        return {key: doc for key, doc in zip(keys, documents) if key not in self._emb_cache}
+    
+    def _embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embed documents with the layer's model, reusing cached embeddings of unchanged text
+        
+        The lock is held through the encode, so concurrent ingests don't embed the same text twice.
+        """
+        keys = [self._embedding_key(doc) for doc in documents]
+        with self._emb_cache_lock:
+            uncached = self._find_uncached_texts(keys, documents)
+            
+            if uncached:
+                embeddings = self._encode(list(uncached.values()))
+                for key, embedding in zip(uncached, embeddings):
+                    self._emb_cache[key] = embedding
+                self._evict_embeddings(keys)
+                if isinstance(self._emb_cache, shelve.Shelf):
+                    self._emb_cache.sync()
+                logger.info(f"Embedded {len(uncached)} of {len(documents)} documents; the rest were cached")
+            
+            return np.stack([self._emb_cache[key] for key in keys]) if keys else self._encode(documents)
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed search queries, reusing the embeddings of recently seen query text
         
+        Queries live in an in-memory LRU rather than the on-disk cache, which only holds schema text.
+        The model runs outside the lock, so other threads' cache hits are not held up by it.
+        """
+        with self._query_lock:
+            found = {query: self._query_embeddings[query] for query in queries if query in self._query_embeddings}
+        
+        missing = list(dict.fromkeys(query for query in queries if query not in found))
+        if missing:
+            found.update(zip(missing, self._encode(missing)))
+        
+        with self._query_lock:
+            for query in queries:
+                self._query_embeddings[query] = found[query]
+                self._query_embeddings.move_to_end(query)
+            while len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        return np.stack([found[query] for query in queries])
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed one search query through the query LRU, so callers and searches share one encoder pass"""
+        return self._embed_queries([query])[0]
+    
+    def _encode(self, documents: List[str]) -> np.ndarray:
+        """Run the embedding model; queries use the same model so vectors match"""
+        # Chroma and the caches expect float32, whatever precision the model ran in
+        return self.embedding_model.encode(
+            documents,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+    
+    def _open_collection(self, name: str):
+        """Return an existing collection; raises if it has not been created"""
+        return self.client.get_collection(name)
+    
+    def _get_or_create_collection(self, name: str):
+        """Return the named collection, recreating it if it was built with other HNSW parameters"""
+        collection = self.client.get_or_create_collection(name=name, metadata=COLLECTION_METADATA)
+        metadata = collection.metadata or {}
+        if any(metadata.get(key) != value for key, value in COLLECTION_METADATA.items()):
+            # HNSW parameters are fixed at creation time; the contents are about to be rewritten anyway
+            logger.info(f"Recreating collection {name} with HNSW parameters {COLLECTION_METADATA}")
+            self.client.delete_collection(name)
+            collection = self.client.create_collection(name=name, metadata=COLLECTION_METADATA)
+        return collection
+    
+    def _upsert_in_batches(self, collection, documents: List[str], embeddings: np.ndarray,
+                           metadatas: List[Dict], ids: List[str]):
+        """Make the collection hold exactly these documents, CHROMA_BATCH_SIZE at a time
+        
+        Entries whose IDs are no longer present (e.g. dropped tables) are deleted; the rest
+        are upserted, so the HNSW index is updated in place instead of rebuilt.
+        """
+        stale_ids = list(set(collection.get(include=[])["ids"]) - set(ids))
+        for i in range(0, len(stale_ids), CHROMA_BATCH_SIZE):
+            collection.delete(ids=stale_ids[i:i+CHROMA_BATCH_SIZE])
+        
+        for i in range(0, len(documents), CHROMA_BATCH_SIZE):
+            collection.upsert(
+                documents=documents[i:i+CHROMA_BATCH_SIZE],
+                embeddings=embeddings[i:i+CHROMA_BATCH_SIZE].tolist(),
+                metadatas=metadatas[i:i+CHROMA_BATCH_SIZE],
+                ids=ids[i:i+CHROMA_BATCH_SIZE]
+            )
+    
+    @staticmethod
+    def _table_records(table_name: str, table_info: Dict[str, Any]) -> List[tuple]:
+        """Build the (document, metadata, id) triples for one table, its columns and foreign keys"""
+        columns = table_info['columns']
+        
+        # Column documents, built in one pass
+        records = [
+            (
+                f"Column {col['name']} in table {table_name}: type {col['type']}"
+                f"{' (NOT NULL)' if not col['nullable'] else ''}"
+                f"{' (PRIMARY KEY)' if col.get('primary_key') else ''}",
+                {
+                    'type': 'column',
+                    'table': table_name,
+                    'column': col['name'],
+                    'data_type': str(col['type']),
+                    'nullable': col['nullable']
+                },
+                f"{table_name}_{col['name']}"
+            )
+            for col in columns
+        ]
+        
+        # Table-level document
+        records.append((
+            f"Table: {table_name}\nColumns: {', '.join(col['name'] for col in columns)}\n",
+            {
+                'type': 'table',
+                'table': table_name,
+                'column_count': len(columns)
+            },
+            f"table_{table_name}"
+        ))
+        
+        # Foreign key relationships
+        records.extend(
+            (
+                f"Foreign key relationship: {table_name}.{fk['constrained_columns'][0]} references {fk['referred_table']}.{fk['referred_columns'][0]}",
+                {
+                    'type': 'foreign_key',
+                    'source_table': table_name,
+                    'target_table': fk['referred_table'],
+                    'source_column': fk['constrained_columns'][0],
+                    'target_column': fk['referred_columns'][0]
+                },
+                f"fk_{table_name}_{fk['constrained_columns'][0]}"
+            )
+            for fk in table_info.get('foreign_keys', [])
+        )
+        
+        return records
+    
     def create_schema_embeddings(self, schema_info: Dict[str, Any], connection_name: str = "default"):
         """Create embeddings for database schema information"""
         try:
             collection_name = f"schema_{connection_name}"
             
-            # Delete existing collection if it exists
-            try:
-                self.client.delete_collection(collection_name)
-            except:
-                pass
-            
-            collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Reuse the existing collection; _upsert_in_batches replaces its contents in place
+            collection = self._get_or_create_collection(collection_name)
             
             documents = []
             metadatas = []
             ids = []
             
-            for table_name, table_info in schema_info.items():
-                # Create document for table
-                table_doc = f"Table: {table_name}\n"
-                table_doc += f"Columns: {', '.join([col['name'] for col in table_info['columns']])}\n"
-                
-                # Add column details
-                for col in table_info['columns']:
-                    col_doc = f"Column {col['name']} in table {table_name}: type {col['type']}"
-                    if not col['nullable']:
-                        col_doc += " (NOT NULL)"
-                    if col.get('primary_key'):
-                        col_doc += " (PRIMARY KEY)"
-                    
-                    documents.append(col_doc)
-                    metadatas.append({
-                        'type': 'column',
-                        'table': table_name,
-                        'column': col['name'],
-                        'data_type': str(col['type']),
-                        'nullable': col['nullable']
-                    })
-                    ids.append(f"{table_name}_{col['name']}")
-                
-                # Add table-level document
-                documents.append(table_doc)
-                metadatas.append({
-                    'type': 'table',
-                    'table': table_name,
-                    'column_count': len(table_info['columns'])
-                })
-                ids.append(f"table_{table_name}")
-                
-                # Add foreign key relationships
-                for fk in table_info.get('foreign_keys', []):
-                    fk_doc = f"Foreign key relationship: {table_name}.{fk['constrained_columns'][0]} references {fk['referred_table']}.{fk['referred_columns'][0]}"
-                    documents.append(fk_doc)
-                    metadatas.append({
-                        'type': 'foreign_key',
-                        'source_table': table_name,
-                        'target_table': fk['referred_table'],
-                        'source_column': fk['constrained_columns'][0],
-                        'target_column': fk['referred_columns'][0]
-                    })
-                    ids.append(f"fk_{table_name}_{fk['constrained_columns'][0]}")
-            
-            # Add documents to collection in batches
-            batch_size = 100
-            for i in range(0, len(documents), batch_size):
-                batch_docs = documents[i:i+batch_size]
-                batch_metas = metadatas[i:i+batch_size]
-                batch_ids = ids[i:i+batch_size]
-                
-                collection.add(
-                    documents=batch_docs,
-                    metadatas=batch_metas,
-                    ids=batch_ids
-                )
+            # Building documents is pure-Python string work and holds the GIL, so threads would not help;
+            # the encoder call below is where the parallel work happens
+            table_records = [self._table_records(table_name, table_info) for table_name, table_info in schema_info.items()]
+            
+            # Skip exact duplicate documents (e.g. several foreign keys sharing a first column)
+            # so they are neither embedded nor indexed twice
+            seen = set()
+            for records in table_records:
+                for doc, meta, doc_id in records:
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    documents.append(doc)
+                    metadatas.append(meta)
+                    ids.append(doc_id)
+            
+            # Embed every document in one call instead of letting Chroma embed each batch
+            embeddings = self._embed_documents(documents)
+            
+            self._upsert_in_batches(collection, documents, embeddings, metadatas, ids)
             
             self.collections[connection_name] = collection
+            self.schema_entities[connection_name] = frozenset(
+                name.lower()
+                for table_name, table_info in schema_info.items()
+                for name in [table_name] + [col['name'] for col in table_info['columns']]
+            )
             logger.info(f"Created schema embeddings for {len(documents)} items")
             
         except Exception as e:
             logger.error(f"Failed to create schema embeddings: {str(e)}")
             raise
     
-    def search_relevant_schema(self, query: str, connection_name: str = "default", top_k: int = 10) -> List[Dict]:
-        """Search for relevant schema elements based on natural language query"""
+    def search_relevant_schema(self, query: str, connection_name: str = "default", top_k: int = 10,
+                               type_filter: Optional[str] = None) -> List[Dict]:
+        """Search for relevant schema elements based on natural language query
+        
+        type_filter restricts results to one metadata type ('table', 'column', 'foreign_key').
+        """
+        results = self.search_relevant_schema_batch([query], connection_name, top_k, type_filter)
+        return results[0] if results else []
+    
+    def search_relevant_schema_batch(self, queries: List[str], connection_name: str = "default", top_k: int = 10,
+                                     type_filter: Optional[str] = None) -> List[List[Dict]]:
+        """Search relevant schema elements for several queries with one embedding pass and one Chroma query
+        
+        Returns one result list per query, in the order the queries were given.
+        """
+        if not queries:
+            return []
+        
         try:
             collection_name = f"schema_{connection_name}"
             
             if connection_name not in self.collections:
-                self.collections[connection_name] = self.client.get_collection(collection_name)
+                self.collections[connection_name] = self._open_collection(collection_name)
             
+            query_embeddings = self._embed_queries(queries)
             results = self.collections[connection_name].query(
-                query_texts=[query],
+                query_embeddings=query_embeddings.tolist(),
                 n_results=top_k,
+                where={"type": type_filter} if type_filter else None,
                 include=['documents', 'metadatas', 'distances']
             )
             
-            relevant_items = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            )):
-                relevant_items.append({
-                    'document': doc,
-                    'metadata': metadata,
-                    'similarity_score': 1 - distance,  # Convert distance to similarity
-                    'rank': i + 1
-                })
-            
-            return relevant_items
+            return [
+                [
+                    {
+                        'document': doc,
+                        'metadata': metadata,
+                        'similarity_score': 1 - distance,  # Convert distance to similarity
+                        'rank': i + 1
+                    }
+                    for i, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances))
+                ]
+                for documents, metadatas, distances in zip(
+                    results['documents'], results['metadatas'], results['distances']
+                )
+            ]
             
         except Exception as e:
             logger.error(f"Schema search failed: {str(e)}")
-            return []
+            return [[] for _ in queries]
+    
+    def get_schema_entities(self, connection_name: str = "default") -> FrozenSet[str]:
+        """Return the lowercased table and column names indexed for a connection"""
+        if connection_name in self.schema_entities:
+            return self.schema_entities[connection_name]
+        
+        try:
+            if connection_name not in self.collections:
+                self.collections[connection_name] = self._open_collection(f"schema_{connection_name}")
+            
+            metadatas = self.collections[connection_name].get(
+                where={"type": {"$in": ["table", "column"]}},
+                include=['metadatas']
+            )['metadatas']
+            entities = frozenset(
+                name.lower()
+                for metadata in metadatas
+                for name in (metadata.get('table'), metadata.get('column'))
+                if name
+            )
+        except Exception as e:
+            logger.error(f"Failed to load schema entities: {str(e)}")
+            return frozenset()
+        
+        self.schema_entities[connection_name] = entities
+        return entities
     
-    def get_relevant_tables_and_columns(self, query: str, connection_name: str = "default") -> Dict[str, List[str]]:
-        """Get relevant tables and columns for a query"""
-        relevant_items = self.search_relevant_schema(query, connection_name, top_k=20)
+    def get_relevant_tables_and_columns(self, query: Union[str, List[str]],
+                                        connection_name: str = "default") -> Dict[str, List[str]]:
+        """Get relevant tables and columns for a query
         
-        tables_columns = {}
+        A list of queries (e.g. rephrasings of one question) is searched in a single batch
+        and the matches are merged.
+        """
+        queries = [query] if isinstance(query, str) else query
+        relevant_items = [
+            item
+            for items in self.search_relevant_schema_batch(queries, connection_name, top_k=20)
+            for item in items
+        ]
+        
+        # dict keys act as an insertion-ordered set: O(1) dedup that keeps relevance order
+        tables_columns = defaultdict(dict)
         
         for item in relevant_items:
             metadata = item['metadata']
             if metadata['type'] in ['column', 'table']:
-                table_name = metadata['table']
-                if table_name not in tables_columns:
-                    tables_columns[table_name] = []
-                
+                columns = tables_columns[metadata['table']]
                 if metadata['type'] == 'column':
-                    column_name = metadata['column']
-                    if column_name not in tables_columns[table_name]:
-                        tables_columns[table_name].append(column_name)
+                    columns[metadata['column']] = None
         
-        return tables_columns
+        return {table_name: list(columns) for table_name, columns in tables_columns.items()}
     
     def create_business_glossary(self, glossary_terms: Dict[str, str], connection_name: str = "default"):
         """Create embeddings for business glossary terms"""
         try:
             collection_name = f"glossary_{connection_name}"
             
-            # Delete existing collection if it exists
-            try:
-                self.client.delete_collection(collection_name)
-            except:
-                pass
-            
-            collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Reuse the existing collection; _upsert_in_batches replaces its contents in place
+            collection = self._get_or_create_collection(collection_name)
             
             documents = []
             metadatas = []
@@ -185,11 +431,7 @@ class SemanticLayer:
                 })
                 ids.append(f"term_{term}")
             
-            collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
+            self._upsert_in_batches(collection, documents, self._embed_documents(documents), metadatas, ids)
             
             logger.info(f"Created business glossary with {len(documents)} terms")
             
@@ -197,5 +439,126 @@ class SemanticLayer:
             logger.error(f"Failed to create business glossary: {str(e)}")
             raise
 
+class FaissCollection:
+    """Collection stored as a FAISS HNSW index plus a parquet sidecar with ids, documents and metadata
+    
+    Vectors are kept 8-bit scalar-quantized in the HNSW graph, a quarter of the float32 size.
+    Implements the subset of the Chroma collection API SemanticLayer uses for reads; writes
+    go through replace(), since FAISS HNSW graphs cannot delete vectors. Saved indexes are
+    memory-mapped on load instead of being read into the process heap.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._index = None
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        
+        if os.path.exists(f"{path}.index"):
+            self._index = faiss.read_index(f"{path}.index", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            records = pd.read_parquet(f"{path}.parquet")
+            self._ids = records['id'].tolist()
+            self._documents = records['document'].tolist()
+            self._metadatas = [json.loads(metadata) for metadata in records['metadata']]
+    
+    def _matching_positions(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Positions of entries matching a Chroma-style {"key": value} or {"key": {"$in": [...]}} filter"""
+        if not where:
+            return None
+        
+        (key, condition), = where.items()
+        allowed = set(condition["$in"]) if isinstance(condition, dict) else {condition}
+        return np.array(
+            [i for i, metadata in enumerate(self._metadatas) if metadata.get(key) in allowed],
+            dtype=np.int64
+        )
+    
+    def get(self, where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict[str, List]:
+        positions = self._matching_positions(where)
+        if positions is None:
+            positions = range(len(self._ids))
+        
+        return {
+            'ids': [self._ids[i] for i in positions],
+            'documents': [self._documents[i] for i in positions],
+            'metadatas': [self._metadatas[i] for i in positions]
+        }
+    
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict[str, List]:
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if self._index is None or not self._index.ntotal:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+        
+        params = faiss.SearchParametersHNSW(efSearch=max(settings.hnsw_search_ef, n_results))
+        positions = self._matching_positions(where)
+        if positions is not None:
+            # Keep a reference to the selector for the duration of the search
+            selector = faiss.IDSelectorBatch(positions)
+            params.sel = selector
+        
+        scores, neighbors = self._index.search(
+            np.ascontiguousarray(query_embeddings, dtype=np.float32), n_results, params=params
+        )
+        
+        for query_scores, query_neighbors in zip(scores, neighbors):
+            hits = [(int(i), float(score)) for i, score in zip(query_neighbors, query_scores) if i != -1]
+            results['ids'].append([self._ids[i] for i, _ in hits])
+            results['documents'].append([self._documents[i] for i, _ in hits])
+            results['metadatas'].append([self._metadatas[i] for i, _ in hits])
+            # Report Chroma's ip distance (1 - dot) so callers convert it the same way
+            results['distances'].append([1 - score for _, score in hits])
+        
+        return results
+    
+    def replace(self, documents: List[str], embeddings: np.ndarray, metadatas: List[Dict], ids: List[str]):
+        """Rebuild the index from these documents and persist it with its sidecar"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        hnsw = faiss.IndexHNSWSQ(embeddings.shape[1], faiss.ScalarQuantizer.QT_8bit, settings.hnsw_m,
+                                 faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = settings.hnsw_construction_ef
+        index = faiss.IndexIDMap2(hnsw)
+        if len(embeddings):
+            # The quantizer learns per-dimension ranges from the vectors being indexed
+            hnsw.train(embeddings)
+            index.add_with_ids(embeddings, np.arange(len(ids), dtype=np.int64))
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        faiss.write_index(index, f"{self.path}.index")
+        pd.DataFrame({
+            'id': ids,
+            'document': documents,
+            'metadata': [json.dumps(metadata) for metadata in metadatas]
+        }).to_parquet(f"{self.path}.parquet", index=False)
+        
+        self._index = index
+        self._ids = list(ids)
+        self._documents = list(documents)
+        self._metadatas = list(metadatas)
+
+class FaissSemanticBackend(SemanticLayer):
+    """SemanticLayer that stores its collections as FAISS HNSW indexes instead of in Chroma"""
+    
+    @staticmethod
+    def _collection_path(name: str) -> str:
+        return os.path.join(settings.chroma_persist_directory, "faiss", name)
+    
+    def _open_collection(self, name: str):
+        path = self._collection_path(name)
+        if not os.path.exists(f"{path}.index"):
+            raise ValueError(f"Collection {name} does not exist")
+        return FaissCollection(path)
+    
+    def _get_or_create_collection(self, name: str):
+        return FaissCollection(self._collection_path(name))
+    
+    def _upsert_in_batches(self, collection, documents: List[str], embeddings: np.ndarray,
+                           metadatas: List[Dict], ids: List[str]):
+        """Rebuild the collection from these documents; HNSW graphs cannot drop stale entries in place"""
+        collection.replace(documents, embeddings, metadatas, ids)
+
 # Global instance
-semantic_layer = SemanticLayer()
+semantic_layer = FaissSemanticBackend() if settings.vector_backend == "faiss" else SemanticLayer()
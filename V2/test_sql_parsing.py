@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for extracting SQL from streamed and complete LLM output
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.sql_agent import _sql_complete, SQLOutputParser
+from agents.sql_agent_fixed import ImprovedSQLAgent
+
+class FakeStreamingLLM:
+    """Yields fixed chunks and records how many were consumed before the stream was closed"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+    
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield SimpleNamespace(content=chunk)
+
+def _stream(chunks):
+    agent = ImprovedSQLAgent.__new__(ImprovedSQLAgent)
+    agent.llm = FakeStreamingLLM(chunks)
+    return asyncio.run(agent._astream_sql([])), agent.llm.consumed
+
+def test_sql_complete_ignores_prose_preamble():
+    """Prose mentioning "select" must not end the stream before any SQL arrives"""
+    assert not _sql_complete("Here is how to select the top customers.\n\n")
+    assert not _sql_complete("To select the top customers, use:\n\n```sql\nSELECT name")
+
+def test_sql_complete_fenced():
+    """A fenced block is complete only once its closing fence arrives"""
+    assert not _sql_complete("```sql\nSELECT name FROM customers;")
+    assert _sql_complete("```sql\nSELECT name FROM customers;\n```")
+    assert _sql_complete("To select the top customers, use:\n\n```sql\nSELECT name FROM customers\n```")
+
+def test_sql_complete_bare():
+    """Bare SQL is complete at the first ';' after a line-anchored SELECT"""
+    assert not _sql_complete("SELECT name\nFROM customers")
+    assert _sql_complete("SELECT name\nFROM customers;")
+    assert _sql_complete("Query:\n  SELECT name FROM customers;")
+
+def test_parser_skips_prose_preamble():
+    """Prose before a fenced block must not be mistaken for the query"""
+    text = "To select the top customers, use:\n\n```sql\nSELECT name FROM customers LIMIT 5;\n```"
+    assert SQLOutputParser().parse(text) == "SELECT name FROM customers LIMIT 5;"
+
+def test_parser_bare_sql():
+    """Bare SQL after prose is taken from its line-anchored SELECT up to the blank line"""
+    text = "Sure, to select them:\nSELECT name\nFROM customers;\n\nThis lists every customer."
+    assert SQLOutputParser().parse(text) == "SELECT name\nFROM customers"
+
+def test_parser_unterminated_fence():
+    """A stop sequence can cut the closing fence; the SQL inside is still returned"""
+    assert SQLOutputParser().parse("```sql\nSELECT name FROM customers") == "SELECT name FROM customers"
+
+def test_astream_sql_ignores_prose_preamble():
+    """A "select" in the preamble and the blank line after it must not end the stream"""
+    chunks = ["Here is how to select", " the top customers.", "\n\n", "SELE", "CT name FROM customers", ";", "\nIt lists names."]
+    text, consumed = _stream(chunks)
+    assert "SELECT name FROM customers;" in text
+    assert consumed == 6
+
+def test_astream_sql_fenced():
+    """SQL right after a code fence is found and the stream stops at its ';'"""
+    text, consumed = _stream(["```sql\n", "SELECT 1", ";", "\n```", " explanation"])
+    assert text == "```sql\nSELECT 1;"
+    assert consumed == 3
+
+if __name__ == "__main__":
+    test_sql_complete_ignores_prose_preamble()
+    test_sql_complete_fenced()
+    test_sql_complete_bare()
+    test_parser_skips_prose_preamble()
+    test_parser_bare_sql()
+    test_parser_unterminated_fence()
+    test_astream_sql_ignores_prose_preamble()
+    test_astream_sql_fenced()
+    print("✅ All SQL parsing tests passed")
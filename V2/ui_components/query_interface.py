@@ -1,14 +1,167 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 import plotly.graph_objects as go
 from typing import Dict, Any, List
+import hashlib
 import logging
+import math
+from collections import deque
 from datetime import datetime
-from agents.enterprise_sql_agent import enterprise_sql_agent as sql_agent
-from visualization.chart_generator import chart_generator
+from itertools import islice
+
+try:
+    from plotly_resampler import FigureResampler
+except ImportError:
+    FigureResampler = None
 
 logger = logging.getLogger(__name__)
 
+# Above this many rows SVG scatter traces get slow in the browser; WebGL keeps them interactive
+WEBGL_ROW_THRESHOLD = 1000
+
+# Above this many rows traces are LTTB-downsampled server-side before being sent to the browser
+RESAMPLE_ROW_THRESHOLD = 5000
+RESAMPLE_SHOWN_SAMPLES = 2000
+
+# Rows sent to the browser per page of the data explorer
+DATA_PAGE_SIZE = 500
+
+# Queries kept in the session history; entries hold the SQL, not the result frame
+QUERY_HISTORY_SIZE = 50
+
+@st.cache_resource(show_spinner=False)
+def _get_sql_agent():
+    """Import the SQL agent on first use so rendering the page doesn't wait on its LLM client"""
+    from agents.enterprise_sql_agent import enterprise_sql_agent
+    return enterprise_sql_agent
+
+@st.cache_resource(show_spinner=False)
+def _get_chart_generator():
+    """Import the chart generator on first use so rendering the page doesn't wait on its LLM client"""
+    from visualization.chart_generator import chart_generator
+    return chart_generator
+
+def _hash_dataframe(df: pd.DataFrame):
+    """Cheap cache key for result frames: shape, columns, dtypes and a digest of the row hashes
+    
+    hash_pandas_object hashes the column buffers in vectorized code, so this avoids
+    Streamlit's default of pickling the whole frame.
+    """
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts) are hashed through their string form
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return (
+        df.shape,
+        tuple(map(str, df.columns)),
+        tuple(map(str, df.dtypes)),
+        hashlib.blake2b(np.ascontiguousarray(row_hashes), digest_size=16).hexdigest()
+    )
+
+_DATAFRAME_HASH_FUNCS = {pd.DataFrame: _hash_dataframe}
+
+@st.cache_data(hash_funcs=_DATAFRAME_HASH_FUNCS, show_spinner=False)
+def _build_dashboard(df: pd.DataFrame, user_query: str) -> List[go.Figure]:
+    """Build dashboard figures once per result instead of on every rerun"""
+    return _get_chart_generator().create_dashboard(df, user_query)
+
+@st.cache_data(hash_funcs=_DATAFRAME_HASH_FUNCS, show_spinner=False)
+def _build_insights(df: pd.DataFrame, user_query: str, sql_query: str) -> str:
+    """Generate insights once per result instead of calling the LLM on every rerun"""
+    return _get_chart_generator().generate_insights(df, user_query, sql_query)
+
+def _to_webgl(fig: go.Figure) -> go.Figure:
+    """Return the figure with its scatter traces rendered through WebGL"""
+    traces = []
+    for trace in fig.data:
+        if trace.type == 'scatter':
+            properties = {k: v for k, v in trace.to_plotly_json().items() if k != 'type'}
+            try:
+                trace = go.Scattergl(properties)
+            except ValueError:
+                # SVG-only features (e.g. stacked areas, spline lines) keep the original trace
+                pass
+        traces.append(trace)
+    return go.Figure(data=traces, layout=fig.layout)
+
+def _downsample(fig: go.Figure) -> go.Figure:
+    """Return the figure with long traces reduced to RESAMPLE_SHOWN_SAMPLES points per trace"""
+    if FigureResampler is None:
+        return fig
+    try:
+        return FigureResampler(fig, default_n_shown_samples=RESAMPLE_SHOWN_SAMPLES)
+    except Exception as e:
+        logger.warning(f"Chart downsampling failed: {str(e)}")
+        return fig
+
+@st.cache_data(hash_funcs=_DATAFRAME_HASH_FUNCS, show_spinner=False)
+def _to_csv(df: pd.DataFrame) -> bytes:
+    """Serialize a result frame to CSV once per distinct frame"""
+    return df.to_csv(index=False).encode()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _query_suggestions(schema_key: tuple, _schema_info: Dict[str, Any]) -> List[str]:
+    """Schema-derived suggestions, cached per set of tables and columns (schema_key)"""
+    return _get_sql_agent().get_query_suggestions(_schema_info)
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a result frame before it is kept in session state
+    
+    Integers take the smallest dtype that holds them, floats become float32 only when no
+    value changes, and object columns where fewer than half the values are distinct
+    become categoricals.
+    """
+    df = df.copy()
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes(include='float').columns:
+        downcast = pd.to_numeric(df[col], downcast='float')
+        if downcast.dtype != df[col].dtype and np.array_equal(downcast.to_numpy(np.float64), df[col].to_numpy(), equal_nan=True):
+            df[col] = downcast
+    for col in df.select_dtypes(include='object').columns:
+        if df[col].nunique() < 0.5 * len(df):
+            df[col] = df[col].astype('category')
+    return df
+
+def _result_meta(df: pd.DataFrame) -> Dict[str, Any]:
+    """Column types and statistics the result tabs need, computed once per result"""
+    numeric_cols = list(df.select_dtypes(include='number').columns)
+    object_cols = list(df.select_dtypes(include=['object', 'string', 'category']).columns)
+    # Range filters also apply to booleans, so give them precomputed bounds too
+    range_cols = list(df.select_dtypes(include=['number', 'bool']).columns)
+    return {
+        'memory_kb': df.memory_usage(deep=True).sum() / 1024,
+        'numeric_cols': numeric_cols,
+        'object_cols': object_cols,
+        'col_stats': {c: {'min': float(df[c].min()), 'max': float(df[c].max())} for c in range_cols},
+        # Per-column uniques and counts, filled in by _object_stats when a tab needs them
+        'object_stats': {}
+    }
+
+def _object_stats(meta: Dict[str, Any], df: pd.DataFrame, col: str) -> Dict[str, Any]:
+    """Uniques, distinct count and value counts of one object column, computed on first use"""
+    object_stats = meta.setdefault('object_stats', {})
+    if col not in object_stats:
+        values = df[col]
+        as_str = False
+        try:
+            nunique = values.nunique()
+        except TypeError:
+            # Unhashable cells (json/jsonb, arrays) are compared through their string form
+            values = values.astype(str)
+            as_str = True
+            nunique = values.nunique()
+        object_stats[col] = {
+            'uniques': values.unique()[:20].tolist(),
+            'nunique': nunique,
+            'value_counts': values.value_counts() if nunique <= 10 else None,
+            'as_str': as_str
+        }
+    return object_stats[col]
+
 class QueryInterface:
     def __init__(self):
         pass
@@ -19,36 +172,32 @@ class QueryInterface:
         st.markdown('<h1 class="main-header">🤖 Ask Your Data Anything</h1>', 
                     unsafe_allow_html=True)
         
-        # Connection status bar
+        # Connection status bar; the metrics are filled in after the query input runs so the
+        # query count already includes a query executed in this run
+        status_metrics = st.empty()
         self._render_status_bar()
         
         # Query input section
         self._render_query_input()
         
+        with status_metrics.container():
+            self._render_status_metrics()
+        
         # Results section
         if st.session_state.get('current_result'):
             self._render_results()
     
-    def _render_status_bar(self):
+    def _render_status_metrics(self):
         """Render connection and system status"""
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            db_type = st.session_state.get('connection_details', {}).get('db_type', 'Unknown')
-            st.success(f"🔗 Connected: {db_type}")
-        
-        with col2:
-            table_count = len(st.session_state.get('schema_info', {}))
-            st.info(f"📋 Tables: {table_count}")
-        
-        with col3:
-            semantic_method = st.session_state.get('semantic_method', 'Unknown')
-            st.info(f"🧠 Semantic: {semantic_method}")
-        
-        with col4:
-            query_count = len(st.session_state.get('query_history', []))
-            st.info(f"📊 Queries: {query_count}")
-        
+        self._render_metric_row({
+            "🔗 Connected": st.session_state.get('connection_details', {}).get('db_type', 'Unknown'),
+            "📋 Tables": len(st.session_state.get('schema_info', {})),
+            "🧠 Semantic": st.session_state.get('semantic_method', 'Unknown'),
+            "📊 Queries": len(st.session_state.get('query_history', []))
+        })
+    
+    def _render_status_bar(self):
+        """Render settings and reset options"""
         # Settings and reset options
         with st.expander("⚙️ Settings & Options"):
             col1, col2, col3 = st.columns(3)
@@ -72,57 +221,56 @@ class QueryInterface:
         """Render query input section"""
         st.header("💬 Natural Language Query")
         
-        # Query input with suggestions
-        col1, col2 = st.columns([3, 1])
+        # Smart suggestions based on schema
+        if st.button("💡 Show Query Suggestions"):
+            self._show_query_suggestions()
         
-        with col1:
-            # Smart suggestions based on schema
-            if st.button("💡 Show Query Suggestions"):
-                self._show_query_suggestions()
-            
-            user_query = st.text_area(
-                "Ask your question in plain English:",
-                placeholder="e.g., Show me the top 10 customers by total revenue this year",
-                height=120,
-                key="main_query_input"
-            )
-            
-            # Quick action buttons
-            col_a, col_b, col_c = st.columns(3)
-            with col_a:
-                if st.button("📈 Sales Analysis", use_container_width=True):
-                    st.session_state.main_query_input = "Show me total sales by month for the last year"
-                    st.rerun()
-            
-            with col_b:
-                if st.button("👥 Customer Insights", use_container_width=True):
-                    st.session_state.main_query_input = "What are the top 10 customers by revenue?"
-                    st.rerun()
-            
-            with col_c:
-                if st.button("📊 Product Performance", use_container_width=True):
-                    st.session_state.main_query_input = "Show me products with highest profit margins"
-                    st.rerun()
+        # Quick action buttons; they sit above the form so they can fill the query box before it renders
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            if st.button("📈 Sales Analysis", use_container_width=True):
+                st.session_state.main_query_input = "Show me total sales by month for the last year"
         
-        with col2:
-            st.write("") # Spacing
-            st.write("") # Spacing
-            st.write("") # Additional spacing for better alignment
-            
-            # Execute button with better styling
-            execute_query = st.button(
-                "🚀 Execute Query", 
-                type="primary", 
-                use_container_width=True
-            )
+        with col_b:
+            if st.button("👥 Customer Insights", use_container_width=True):
+                st.session_state.main_query_input = "What are the top 10 customers by revenue?"
+        
+        with col_c:
+            if st.button("📊 Product Performance", use_container_width=True):
+                st.session_state.main_query_input = "Show me products with highest profit margins"
+        
+        # Inputs live in a form, so typing and adjusting options only rerun the page on submit
+        with st.form("query_form", clear_on_submit=False, border=False):
+            col1, col2 = st.columns([3, 1])
             
-            st.write("") # Small spacing
+            with col1:
+                user_query = st.text_area(
+                    "Ask your question in plain English:",
+                    placeholder="e.g., Show me the top 10 customers by total revenue this year",
+                    height=120,
+                    key="main_query_input"
+                )
             
-            # Query options
-            with st.expander("⚙️ Query Options"):
-                max_results = st.slider("Max Results", 10, 10000, 1000)
-                show_sql = st.checkbox("Show Generated SQL", value=True)
-                auto_visualize = st.checkbox("Auto-generate Charts", value=True)
+            with col2:
+                st.write("") # Spacing
+                st.write("") # Spacing
+                st.write("") # Additional spacing for better alignment
+                
+                # Execute button with better styling
+                execute_query = st.form_submit_button(
+                    "🚀 Execute Query", 
+                    type="primary", 
+                    use_container_width=True
+                )
+                
+                st.write("") # Small spacing
+                
+                # Query options
+                with st.expander("⚙️ Query Options"):
+                    max_results = st.slider("Max Results", 10, 10000, 1000)
+                    show_sql = st.checkbox("Show Generated SQL", value=True)
+                    auto_visualize = st.checkbox("Auto-generate Charts", value=True)
+                    st.checkbox("Use WebGL for large charts", value=True, key="use_webgl")
         
         # Execute query
         if execute_query and user_query.strip():
@@ -145,32 +293,31 @@ class QueryInterface:
         # Quick stats
         execution_result = result.get('execution_result')
         if execution_result is not None and not execution_result.empty:
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("📝 Rows Returned", len(execution_result))
-            with col2:
-                st.metric("📊 Columns", len(execution_result.columns))
-            with col3:
-                confidence = result.get('confidence_score', 0)
-                st.metric("🎯 Confidence", f"{confidence:.2f}")
-            with col4:
-                st.metric("⏱️ Query Time", "< 1s")  # Could be enhanced with actual timing
-        
-        # Tabbed results view
-        tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "🔍 Data", "💻 SQL", "🧠 Insights"])
-        
-        with tab1:
-            self._render_dashboard_tab(result)
-        
-        with tab2:
-            self._render_data_tab(result)
-        
-        with tab3:
-            self._render_sql_tab(result)
+            self._render_metric_row({
+                "📝 Rows Returned": f"{len(execution_result):,}",
+                "📊 Columns": len(execution_result.columns),
+                "🎯 Confidence": f"{result.get('confidence_score', 0):.2f}",
+                "⏱️ Query Time": "< 1s"  # Could be enhanced with actual timing
+            })
         
-        with tab4:
-            self._render_insights_tab(result)
+        # Tabbed results view. st.tabs runs every tab body on each rerun, so a radio picks the
+        # one tab to render; each tab is a fragment, so its widgets only rerun that tab
+        tabs = {
+            "📊 Dashboard": self._render_dashboard_tab,
+            "🔍 Data": self._render_data_tab,
+            "💻 SQL": self._render_sql_tab,
+            "🧠 Insights": self._render_insights_tab
+        }
+        active_tab = st.radio(
+            "Results view",
+            list(tabs),
+            horizontal=True,
+            key="active_result_tab",
+            label_visibility="collapsed"
+        )
+        tabs[active_tab](result)
     
+    @st.fragment
     def _render_dashboard_tab(self, result: Dict[str, Any]):
         """Render dashboard tab"""
         st.subheader("📊 Interactive Dashboard")
@@ -179,7 +326,11 @@ class QueryInterface:
         if df is not None and not df.empty:
             # Generate multiple charts
             try:
-                charts = chart_generator.create_dashboard(df, result['user_query'])
+                charts = _build_dashboard(df, result['user_query'])
+                if len(df) > RESAMPLE_ROW_THRESHOLD:
+                    charts = [_downsample(chart) for chart in charts]
+                if st.session_state.get('use_webgl', True) and len(df) > WEBGL_ROW_THRESHOLD:
+                    charts = [_to_webgl(chart) for chart in charts]
                 
                 if len(charts) == 1:
                     st.plotly_chart(charts[0], use_container_width=True)
@@ -201,7 +352,7 @@ class QueryInterface:
                                 st.plotly_chart(chart, use_container_width=True)
                 
                 # Key metrics
-                self._render_key_metrics(df)
+                self._render_key_metrics(df, self._get_result_meta(result))
                 
             except Exception as e:
                 st.error(f"❌ Visualization error: {str(e)}")
@@ -210,21 +361,21 @@ class QueryInterface:
         else:
             st.info("📭 No data to visualize")
     
+    @st.fragment
     def _render_data_tab(self, result: Dict[str, Any]):
         """Render data exploration tab"""
         st.subheader("🔍 Data Explorer")
         
         df = result.get('execution_result')
         if df is not None and not df.empty:
+            meta = self._get_result_meta(result)
+            
             # Data summary
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Rows", len(df))
-            with col2:
-                st.metric("Columns", len(df.columns))
-            with col3:
-                memory_usage = df.memory_usage(deep=True).sum() / 1024
-                st.metric("Memory", f"{memory_usage:.1f} KB")
+            self._render_metric_row({
+                "Rows": f"{len(df):,}",
+                "Columns": len(df.columns),
+                "Memory": f"{meta['memory_kb']:.1f} KB"
+            })
             
             # Column selection and filtering
             with st.expander("🔧 Data Controls"):
@@ -241,13 +392,24 @@ class QueryInterface:
                     filter_column = st.selectbox("Filter by column:", ["None"] + selected_columns)
                     
                     if filter_column != "None":
-                        if df[filter_column].dtype == 'object':
-                            unique_values = df[filter_column].unique()[:20]  # Limit for performance
+                        if filter_column in meta['object_cols']:
+                            stats = _object_stats(meta, df, filter_column)
+                            unique_values = stats['uniques']  # Limit for performance
                             selected_values = st.multiselect(f"Select {filter_column} values:", unique_values)
                             if selected_values:
-                                df = df[df[filter_column].isin(selected_values)]
+                                # Compare small integer category codes instead of hashing every object cell
+                                categoricals = meta.setdefault('categoricals', {})
+                                if filter_column not in categoricals:
+                                    column = df[filter_column].astype(str) if stats['as_str'] else df[filter_column]
+                                    categoricals[filter_column] = column.astype('category')
+                                cat = categoricals[filter_column].cat
+                                selected_codes = cat.categories.get_indexer(selected_values)
+                                df = df[np.isin(cat.codes.to_numpy(), selected_codes)]
                         else:
-                            min_val, max_val = float(df[filter_column].min()), float(df[filter_column].max())
+                            stats = meta['col_stats'].get(filter_column) or {
+                                'min': float(df[filter_column].min()), 'max': float(df[filter_column].max())
+                            }
+                            min_val, max_val = stats['min'], stats['max']
                             if min_val != max_val:
                                 range_vals = st.slider(f"Select {filter_column} range:", min_val, max_val, (min_val, max_val))
                                 df = df[(df[filter_column] >= range_vals[0]) & (df[filter_column] <= range_vals[1])]
@@ -255,21 +417,41 @@ class QueryInterface:
             # Display data
             if selected_columns:
                 display_df = df[selected_columns] if selected_columns else df
-                st.dataframe(display_df, use_container_width=True, height=400)
                 
-                # Download option
-                csv = display_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download as CSV",
-                    data=csv,
-                    file_name=f"query_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
+                # Only the current page is serialized to the browser; the download has every row
+                n_pages = max(1, math.ceil(len(display_df) / DATA_PAGE_SIZE))
+                page = 1
+                if n_pages > 1:
+                    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+                start = (page - 1) * DATA_PAGE_SIZE
+                arrow_table = result.get('_arrow')
+                if arrow_table is not None and df is result['execution_result']:
+                    # Unfiltered: zero-copy column projection and row slice of the precomputed Arrow table
+                    page_data = arrow_table.select(selected_columns).slice(start, DATA_PAGE_SIZE)
+                else:
+                    page_data = display_df.iloc[start:start + DATA_PAGE_SIZE]
+                st.dataframe(page_data, use_container_width=True, height=400)
+                if n_pages > 1:
+                    st.caption(f"Showing rows {start + 1:,}–{min(start + DATA_PAGE_SIZE, len(display_df)):,} of {len(display_df):,}")
+                
+                # Download option; the CSV is only built once the user asks for it
+                if not st.session_state.get('csv_requested'):
+                    if st.button("📄 Prepare CSV Download"):
+                        st.session_state.csv_requested = True
+                        st.rerun(scope="fragment")
+                else:
+                    st.download_button(
+                        label="📥 Download as CSV",
+                        data=_to_csv(display_df),
+                        file_name=f"query_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv"
+                    )
             else:
                 st.warning("Please select at least one column to display")
         else:
             st.info("📭 No data to display")
     
+    @st.fragment
     def _render_sql_tab(self, result: Dict[str, Any]):
         """Render SQL tab with enhanced information"""
         st.subheader("💻 Generated SQL Query")
@@ -330,6 +512,7 @@ class QueryInterface:
         else:
             st.info("💻 No SQL query generated")
     
+    @st.fragment
     def _render_insights_tab(self, result: Dict[str, Any]):
         """Render insights tab"""
         st.subheader("🧠 AI-Generated Insights")
@@ -341,7 +524,7 @@ class QueryInterface:
         if df is not None and not df.empty:
             with st.spinner("🤖 Generating insights..."):
                 try:
-                    insights = chart_generator.generate_insights(df, user_query, sql_query)
+                    insights = _build_insights(df, user_query, sql_query)
                     
                     # Display insights in a nice format
                     st.markdown(f"""
@@ -355,70 +538,113 @@ class QueryInterface:
             
             # Statistical summary
             with st.expander("📊 Statistical Summary"):
+                meta = self._get_result_meta(result)
+                
                 # Numeric columns
-                numeric_cols = df.select_dtypes(include=['number']).columns
+                numeric_cols = meta['numeric_cols']
                 if len(numeric_cols) > 0:
                     st.write("**Numeric Columns:**")
-                    st.dataframe(df[numeric_cols].describe())
+                    # Built on first view of the summary, then kept with the result
+                    if 'describe' not in meta:
+                        meta['describe'] = df[numeric_cols].describe()
+                    st.dataframe(meta['describe'])
                 
                 # Categorical columns
-                categorical_cols = df.select_dtypes(include=['object']).columns
-                if len(categorical_cols) > 0:
+                if len(meta['object_cols']) > 0:
                     st.write("**Categorical Columns:**")
-                    for col in categorical_cols[:3]:
-                        st.write(f"**{col}:** {df[col].nunique()} unique values")
-                        if df[col].nunique() <= 10:
-                            value_counts = df[col].value_counts()
-                            st.write(value_counts)
+                    for col in meta['object_cols'][:3]:
+                        stats = _object_stats(meta, df, col)
+                        st.write(f"**{col}:** {stats['nunique']} unique values")
+                        if stats['value_counts'] is not None:
+                            st.write(stats['value_counts'])
         else:
             st.info("🤖 No data available for insights generation")
     
-    def _render_key_metrics(self, df: pd.DataFrame):
+    def _get_result_meta(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the precomputed column metadata of a result, computing it for older results"""
+        if '_meta' not in result:
+            result['_meta'] = _result_meta(result['execution_result'])
+        return result['_meta']
+    
+    def _render_key_metrics(self, df: pd.DataFrame, meta: Dict[str, Any]):
         """Render key metrics from data"""
         if df.empty:
             return
         
         st.subheader("📈 Key Metrics")
-        cols = st.columns(4)
-        
-        with cols[0]:
-            st.metric("Total Rows", f"{len(df):,}")
-        
-        with cols[1]:
-            st.metric("Columns", len(df.columns))
         
-        # Try to find numeric columns for additional metrics
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        if len(numeric_cols) > 0:
-            first_numeric = df[numeric_cols[0]]
+        # The reductions run once per result; later reruns reuse the formatted values
+        if 'key_metrics' not in meta:
+            metrics = {
+                "Total Rows": f"{len(df):,}",
+                "Columns": len(df.columns)
+            }
             
-            with cols[2]:
-                avg_val = first_numeric.mean()
-                st.metric(f"Avg {numeric_cols[0]}", f"{avg_val:,.2f}")
-            
-            with cols[3]:
-                max_val = first_numeric.max()
-                st.metric(f"Max {numeric_cols[0]}", f"{max_val:,.2f}")
+            # Try to find numeric columns for additional metrics
+            numeric_cols = meta['numeric_cols']
+            if len(numeric_cols) > 0:
+                first_numeric = df[numeric_cols[0]]
+                metrics[f"Avg {numeric_cols[0]}"] = f"{first_numeric.mean():,.2f}"
+                metrics[f"Max {numeric_cols[0]}"] = f"{first_numeric.max():,.2f}"
+            meta['key_metrics'] = metrics
+        
+        self._render_metric_row(meta['key_metrics'])
+    
+    def _render_metric_row(self, metrics: Dict[str, Any]):
+        """Render a row of labelled values as one markdown table instead of a widget per value"""
+        def cell(value: Any) -> str:
+            return str(value).replace("|", "\\|")
+        
+        header = " | ".join(cell(label) for label in metrics)
+        divider = " | ".join("---" for _ in metrics)
+        values = " | ".join(f"**{cell(value)}**" for value in metrics.values())
+        st.markdown(f"| {header} |\n| {divider} |\n| {values} |")
     
     def _execute_query(self, user_query: str, options: Dict[str, Any]):
         """Execute natural language query"""
         try:
             with st.spinner("🧠 Processing your query..."):
                 # Process query through SQL agent
-                result = sql_agent.process_query(user_query)
+                result = _get_sql_agent().process_query(user_query)
+                
+                # Shrink the result before it lives in session state for the rest of the session
+                execution_result = result.get('execution_result')
+                if execution_result is not None and not execution_result.empty:
+                    try:
+                        execution_result = _downcast(execution_result)
+                        result = dict(result, execution_result=execution_result)
+                    except Exception as e:
+                        logger.warning(f"Result downcast failed: {str(e)}")
                 
                 # Add to history
-                if 'query_history' not in st.session_state:
-                    st.session_state.query_history = []
+                if not isinstance(st.session_state.get('query_history'), deque):
+                    st.session_state.query_history = deque(
+                        st.session_state.get('query_history', []), maxlen=QUERY_HISTORY_SIZE
+                    )
                 
                 st.session_state.query_history.append({
                     'query': user_query,
                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'result': result
+                    'generated_sql': result.get('generated_sql', ''),
+                    'row_count': len(execution_result) if execution_result is not None else 0
                 })
                 
                 # Store current result
                 st.session_state.current_result = result
+                st.session_state.csv_requested = False
+                
+                # Column types and stats are fixed per result; compute them once for every tab
+                if execution_result is not None and not execution_result.empty:
+                    try:
+                        result['_meta'] = _result_meta(execution_result)
+                    except Exception as e:
+                        # The tabs compute it on demand; a bad column must not fail the query
+                        logger.warning(f"Result metadata failed: {str(e)}")
+                    # Convert to Arrow once; st.dataframe would otherwise convert the frame on every render
+                    try:
+                        result['_arrow'] = pa.Table.from_pandas(execution_result, preserve_index=False)
+                    except (pa.ArrowException, TypeError, ValueError) as e:
+                        logger.warning(f"Arrow conversion failed, showing pandas data: {str(e)}")
                 
                 # Show execution status
                 if result.get('error_message'):
@@ -430,8 +656,6 @@ class QueryInterface:
                     else:
                         st.warning("⚠️ Query executed but returned no data.")
                 
-                st.rerun()
-                
         except Exception as e:
             st.error(f"❌ Execution failed: {str(e)}")
             logger.error(f"Query execution failed: {str(e)}")
@@ -442,7 +666,11 @@ class QueryInterface:
         
         if schema_info:
             # Get intelligent suggestions from the enterprise agent
-            suggestions = sql_agent.get_query_suggestions(schema_info)
+            schema_key = tuple(
+                (table_name, tuple(col['name'] for col in table_info.get('columns', [])))
+                for table_name, table_info in schema_info.items()
+            )
+            suggestions = _query_suggestions(schema_key, schema_info)
             
             if suggestions:
                 st.info("💡 **Intelligent Query Suggestions:**\n" + "\n".join([f"• {s}" for s in suggestions]))
@@ -465,7 +693,7 @@ class QueryInterface:
         
         if history:
             st.subheader("📊 Query History")
-            for i, query_item in enumerate(reversed(history[-10:])):
+            for i, query_item in enumerate(islice(reversed(history), 10)):
                 with st.expander(f"Query {len(history) - i}: {query_item['query'][:50]}..."):
                     st.write(f"**Time:** {query_item['timestamp']}")
                     st.write(f"**Query:** {query_item['query']}")
@@ -1,16 +1,125 @@
 import streamlit as st
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import logging
 import time
 from datetime import datetime
 from config.settings import settings
 from database.connection_manager import db_manager
-from database.nosql_connection_manager import nosql_manager
-from semantic_layer.enhanced_semantic_layer import enhanced_semantic_layer
 
 logger = logging.getLogger(__name__)
 
+# Schema introspection results are reused across reruns for this long (seconds)
+SCHEMA_CACHE_TTL = 3600
+
+# Number of NoSQL tables described during schema analysis
+NOSQL_TABLE_LIMIT = 10
+
+# Tables with more columns than this are flagged as high-dimensional
+HIGH_DIM_COLUMNS = 50
+
+# Minimum interval (seconds) between redraws of the remaining-tables list during generation
+PROGRESS_REFRESH_SECONDS = 1.0
+
+SQL_DB_TYPES = ["PostgreSQL", "MySQL", "Oracle"]
+
+@st.cache_resource(show_spinner=False)
+def _get_nosql_manager():
+    """Import the NoSQL manager on first use so SQL-only setups never load boto3"""
+    from database.nosql_connection_manager import nosql_manager
+    return nosql_manager
+
+@st.cache_resource(show_spinner=False)
+def _get_enhanced_semantic_layer():
+    """Import the enhanced semantic layer on first use so the connection step doesn't wait on its models"""
+    from semantic_layer.enhanced_semantic_layer import enhanced_semantic_layer
+    return enhanced_semantic_layer
+
+@st.cache_resource(show_spinner=False)
+def get_sql_engine(db_type: str, **params):
+    """Return a pooled engine shared by every rerun and session using the same connection params"""
+    return db_manager.build_engine(db_manager.get_connection_string(db_type, **params))
+
+@st.cache_resource(show_spinner=False)
+def get_boto_client(service: str, region: str, ak: str, sk: str):
+    """Return a boto3 client shared by every rerun and session using the same credentials"""
+    import boto3
+    return boto3.Session(aws_access_key_id=ak, aws_secret_access_key=sk, region_name=region).client(service)
+
+@st.cache_resource(show_spinner=False)
+def get_boto_resource(service: str, region: str, ak: str, sk: str):
+    """Return a boto3 resource shared by every rerun and session using the same credentials"""
+    import boto3
+    return boto3.Session(aws_access_key_id=ak, aws_secret_access_key=sk, region_name=region).resource(service)
+
+def _connection_fingerprint(params: Dict[str, Any]) -> str:
+    """Hash connection params so they can key a cache without appearing in it"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+@st.cache_data(ttl=SCHEMA_CACHE_TTL, show_spinner=False)
+def _dynamodb_tables(conn_fingerprint: str) -> List[str]:
+    return _get_nosql_manager().get_dynamodb_tables()
+
+@st.cache_data(ttl=SCHEMA_CACHE_TTL, show_spinner=False)
+def _introspect_schema(db_type: str, conn_fingerprint: str, include_views: bool) -> Dict[str, Any]:
+    """Read the connected database's schema; cached per connection so reruns skip the round-trips"""
+    if db_type in SQL_DB_TYPES:
+        return db_manager.get_table_schema(include_views=include_views)
+    
+    nosql_manager = _get_nosql_manager()
+    if db_type == "DynamoDB":
+        tables = _dynamodb_tables(conn_fingerprint)[:NOSQL_TABLE_LIMIT]  # Limit for demo
+        describe = nosql_manager.get_dynamodb_table_schema
+    else:  # Athena
+        databases = nosql_manager.get_athena_databases()
+        if not databases:
+            return {}
+        tables = nosql_manager.get_athena_tables(databases[0])[:NOSQL_TABLE_LIMIT]
+        describe = lambda table: nosql_manager.get_athena_table_schema(databases[0], table)
+    
+    if not tables:
+        return {}
+    
+    # Each describe call is an independent AWS round-trip, so overlap them (boto3 clients are thread-safe)
+    with ThreadPoolExecutor(max_workers=min(16, len(tables))) as executor:
+        return dict(zip(tables, executor.map(describe, tables)))
+
+def _schema_fingerprint(schema_info: Dict[str, Any]) -> str:
+    """Hash table names and column counts; cheap to compute, and changes whenever the schema shape does"""
+    shape = sorted((name, len(info.get('columns', []))) for name, info in schema_info.items())
+    return hashlib.sha1(json.dumps(shape).encode()).hexdigest()
+
+@st.cache_data(show_spinner=False)
+def _schema_summary(schema_key: Any, _schema_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Table/column counts and high-dimensional tables for a schema, cached per session schema_key"""
+    return {
+        "n_tables": len(_schema_info),
+        "n_columns": sum(len(t.get('columns', [])) for t in _schema_info.values()),
+        "high_dim": [n for n, i in _schema_info.items() if len(i.get('columns', [])) > HIGH_DIM_COLUMNS]
+    }
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _template_csv(schema_key: Any, schema_fingerprint: str, _schema_info: Dict[str, Any]) -> Tuple[bytes, int]:
+    """Serialize the metadata template once per schema; returns the CSV bytes and row count"""
+    template_df = _get_enhanced_semantic_layer().export_enhanced_metadata_template(_schema_info)
+    return template_df.to_csv(index=False).encode(), len(template_df)
+
+@st.cache_data(show_spinner=False, max_entries=1000)
+def _columns_frame(schema_key: Any, table_name: str, _columns: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build the column table for one schema table.
+
+    Keyed on the session's schema_key and the table name, so switching table tabs
+    doesn't rebuild frames and a re-analyzed schema gets fresh ones.
+    """
+    df = pd.DataFrame(_columns).reindex(columns=["name", "type", "nullable", "primary_key"])
+    df["type"] = df["type"].astype(str)
+    df["nullable"] = df["nullable"].fillna(True).astype(bool)
+    df["primary_key"] = df["primary_key"].fillna(False).astype(bool)
+    return df.rename(columns={"primary_key": "pk"})
+
 class SetupWizard:
     def __init__(self):
         self.steps = [
@@ -67,22 +176,22 @@ class SetupWizard:
         st.header("🔗 Step 1: Connect to Your Database")
         st.write("Choose your database type and provide connection details.")
         
-        # Database type selection (without session state key to avoid conflicts)
         db_types = ["PostgreSQL", "MySQL", "Oracle", "DynamoDB", "Athena"]
         
-        # Use a different approach to avoid session state conflicts
-        if 'selected_db_type' not in st.session_state:
-            st.session_state.selected_db_type = "PostgreSQL"
+        if 'last_db_type' not in st.session_state:
+            st.session_state.last_db_type = "PostgreSQL"
         
-        selected_db_type = st.selectbox(
-            "Database Type:",
-            db_types,
-            index=db_types.index(st.session_state.selected_db_type),
-            key="wizard_db_type"
-        )
+        # The choice only takes effect on Apply, so browsing the list doesn't rerun the step
+        with st.form("db_selector"):
+            db_type_choice = st.selectbox(
+                "Database Type:",
+                db_types,
+                index=db_types.index(st.session_state.last_db_type)
+            )
+            if st.form_submit_button("Apply"):
+                st.session_state.last_db_type = db_type_choice
         
-        # Update session state
-        st.session_state.selected_db_type = selected_db_type
+        selected_db_type = st.session_state.last_db_type
         
         # Connection form
         with st.form("database_connection_form"):
@@ -94,6 +203,7 @@ class SetupWizard:
                 database = st.text_input("Database", value=settings.postgres_db or "")
                 username = st.text_input("Username", value=settings.postgres_user or "")
                 password = st.text_input("Password", type="password")
+                params = {"host": host, "port": port, "database": database, "username": username, "password": password}
                 
             elif selected_db_type == "MySQL":
                 host = st.text_input("Host", value=settings.mysql_host or "localhost")
@@ -101,6 +211,7 @@ class SetupWizard:
                 database = st.text_input("Database", value=settings.mysql_db or "")
                 username = st.text_input("Username", value=settings.mysql_user or "")
                 password = st.text_input("Password", type="password")
+                params = {"host": host, "port": port, "database": database, "username": username, "password": password}
                 
             elif selected_db_type == "Oracle":
                 host = st.text_input("Host", value=settings.oracle_host or "localhost")
@@ -108,17 +219,20 @@ class SetupWizard:
                 service = st.text_input("Service Name", value=settings.oracle_service or "")
                 username = st.text_input("Username", value=settings.oracle_user or "")
                 password = st.text_input("Password", type="password")
+                params = {"host": host, "port": port, "service": service, "username": username, "password": password}
                 
             elif selected_db_type == "DynamoDB":
                 region = st.text_input("AWS Region", value="us-east-1")
                 access_key = st.text_input("AWS Access Key ID")
                 secret_key = st.text_input("AWS Secret Access Key", type="password")
+                params = {"region": region, "access_key": access_key, "secret_key": secret_key}
                 
             else:  # Athena
                 region = st.text_input("AWS Region", value="us-east-1")
                 access_key = st.text_input("AWS Access Key ID")
                 secret_key = st.text_input("AWS Secret Access Key", type="password")
                 s3_output = st.text_input("S3 Output Location", value="s3://aws-athena-query-results-default/")
+                params = {"region": region, "access_key": access_key, "secret_key": secret_key, "s3_output": s3_output}
             
             # Test connection button
             col1, col2 = st.columns([1, 1])
@@ -129,7 +243,7 @@ class SetupWizard:
         
         # Handle connection testing
         if test_connection or connect_and_continue:
-            success = self._test_database_connection(selected_db_type, locals())
+            success = self._test_database_connection(selected_db_type, params)
             
             if success:
                 st.success("✅ Connection successful!")
@@ -137,8 +251,7 @@ class SetupWizard:
                     # Store connection details
                     st.session_state.connection_details = {
                         'db_type': selected_db_type,
-                        'params': {k: v for k, v in locals().items() 
-                                 if k not in ['test_connection', 'connect_and_continue', 'selected_db_type', 'success']}
+                        'params': params
                     }
                     st.session_state.connected = True
                     st.session_state.wizard_step = 1
@@ -151,54 +264,63 @@ class SetupWizard:
         st.header("📊 Step 2: Database Schema Analysis")
         st.write("Analyzing your database structure...")
         
-        if 'schema_analysis_done' not in st.session_state:
-            with st.spinner("🔍 Analyzing database schema..."):
-                try:
-                    # Get schema information
-                    db_type = st.session_state.connection_details['db_type']
-                    
-                    if db_type in ["PostgreSQL", "MySQL", "Oracle"]:
-                        # Add option to include views
-                        include_views = st.checkbox(
-                            "Include database views", 
-                            value=False,
-                            help="Check this if you want to include database views along with tables"
-                        )
-                        schema_info = db_manager.get_table_schema(include_views=include_views)
-                    elif db_type == "DynamoDB":
-                        tables = nosql_manager.get_dynamodb_tables()
-                        schema_info = {}
-                        for table in tables[:10]:  # Limit for demo
-                            schema_info[table] = nosql_manager.get_dynamodb_table_schema(table)
-                    else:  # Athena
-                        databases = nosql_manager.get_athena_databases()
-                        schema_info = {}
-                        if databases:
-                            tables = nosql_manager.get_athena_tables(databases[0])
-                            for table in tables[:10]:
-                                schema_info[table] = nosql_manager.get_athena_table_schema(databases[0], table)
-                    
-                    st.session_state.schema_info = schema_info
-                    st.session_state.schema_analysis_done = True
-                    
-                except Exception as e:
-                    st.error(f"❌ Schema analysis failed: {str(e)}")
-                    return
+        db_type = st.session_state.connection_details['db_type']
+        if db_type in SQL_DB_TYPES:
+            # Add option to include views
+            with st.form("schema_options"):
+                include_views_choice = st.checkbox(
+                    "Include database views", 
+                    value=st.session_state.get('include_views', False),
+                    help="Check this if you want to include database views along with tables"
+                )
+                if st.form_submit_button("Apply"):
+                    st.session_state.include_views = include_views_choice
+        include_views = st.session_state.get('include_views', False)
+        
+        with st.spinner("🔍 Analyzing database schema..."):
+            try:
+                conn_fingerprint = _connection_fingerprint(st.session_state.connection_details['params'])
+                schema_key = (db_type, conn_fingerprint, include_views)
+                # cache_data hands back a fresh copy per call, so keep the session's object while
+                # the key is unchanged; the caches below are keyed on schema_key
+                if st.session_state.get('schema_key') != schema_key:
+                    st.session_state.schema_info = _introspect_schema(*schema_key)
+                    st.session_state.schema_key = schema_key
+            except Exception as e:
+                st.error(f"❌ Schema analysis failed: {str(e)}")
+                return
         
         # Show schema summary
         schema_info = st.session_state.schema_info
+        summary = _schema_summary(st.session_state.schema_key, schema_info)
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("📋 User Tables", len(schema_info))
+            st.metric("📋 User Tables", summary['n_tables'])
         with col2:
-            total_columns = sum(len(table.get('columns', [])) for table in schema_info.values())
-            st.metric("📊 Total Columns", total_columns)
+            st.metric("📊 Total Columns", summary['n_columns'])
         with col3:
-            avg_columns = total_columns / len(schema_info) if schema_info else 0
+            avg_columns = summary['n_columns'] / summary['n_tables'] if summary['n_tables'] else 0
             st.metric("📈 Avg Columns/Table", f"{avg_columns:.1f}")
         
         # Show all tables in an expandable view
+        self._render_schema_browser(schema_info)
+        
+        # Complexity analysis
+        high_dim_tables = summary['high_dim']
+        
+        if high_dim_tables:
+            st.warning(f"⚠️ Found {len(high_dim_tables)} high-dimensional tables (>{HIGH_DIM_COLUMNS} columns): {', '.join(high_dim_tables[:3])}{'...' if len(high_dim_tables) > 3 else ''}. Enhanced semantic layer recommended.")
+        else:
+            st.success("✅ Schema complexity looks manageable. All semantic layer options will work well.")
+        
+        # Continue button
+        if st.button("➡️ Continue to Semantic Setup", type="primary", use_container_width=True):
+            st.session_state.wizard_step = 2
+            st.rerun()
+    
+    def _render_schema_browser(self, schema_info: Dict[str, Any]):
+        """Render the all-tables expander"""
         with st.expander("🔍 All Tables & Columns", expanded=True):
             # Create tabs for better organization if many tables
             if len(schema_info) > 10:
@@ -224,20 +346,6 @@ class SetupWizard:
                 # Show all tables directly
                 for table_name, table_info in schema_info.items():
                     self._render_table_info(table_name, table_info)
-        
-        # Complexity analysis
-        high_dim_tables = [name for name, info in schema_info.items() 
-                          if len(info.get('columns', [])) > 50]
-        
-        if high_dim_tables:
-            st.warning(f"⚠️ Found {len(high_dim_tables)} high-dimensional tables (>50 columns): {', '.join(high_dim_tables[:3])}{'...' if len(high_dim_tables) > 3 else ''}. Enhanced semantic layer recommended.")
-        else:
-            st.success("✅ Schema complexity looks manageable. All semantic layer options will work well.")
-        
-        # Continue button
-        if st.button("➡️ Continue to Semantic Setup", type="primary", use_container_width=True):
-            st.session_state.wizard_step = 2
-            st.rerun()
     
     def _render_table_info(self, table_name: str, table_info: Dict[str, Any]):
         """Render information for a single table"""
@@ -250,15 +358,8 @@ class SetupWizard:
                 st.write(f"**📋 {table_name}**")
                 if columns:
                     # Show first 10 columns with their types
-                    col_display = []
-                    for col in columns[:10]:
-                        col_name = col.get('name', 'unknown')
-                        col_type = str(col.get('type', 'unknown'))
-                        nullable = "NULL" if col.get('nullable', True) else "NOT NULL"
-                        pk = " 🔑" if col.get('primary_key', False) else ""
-                        col_display.append(f"• {col_name} ({col_type}) {nullable}{pk}")
-                    
-                    st.write("\n".join(col_display))
+                    columns_df = _columns_frame(st.session_state.schema_key, table_name, columns)
+                    st.dataframe(columns_df.head(10), use_container_width=True, hide_index=True)
                     
                     if len(columns) > 10:
                         st.write(f"... and {len(columns) - 10} more columns")
@@ -315,9 +416,10 @@ class SetupWizard:
                 
             with col2:
                 schema_info = st.session_state.schema_info
-                total_columns = sum(len(table.get('columns', [])) for table in schema_info.values())
+                summary = _schema_summary(st.session_state.schema_key, schema_info)
+                total_columns = summary['n_columns']
                 
-                st.metric("Tables to Process", len(schema_info))
+                st.metric("Tables to Process", summary['n_tables'])
                 st.metric("Columns to Process", total_columns)
                 
                 estimated_time = max(1, total_columns // 100)
@@ -360,9 +462,12 @@ class SetupWizard:
         
         # Step 1: Download template
         st.write("**Step 1: Download Template**")
-        template_df = enhanced_semantic_layer.export_enhanced_metadata_template(st.session_state.schema_info)
+        schema_info = st.session_state.schema_info
+        # schema_key is only set by schema analysis; the fingerprint covers schema_info set elsewhere
+        csv_template, template_rows = _template_csv(
+            st.session_state.get('schema_key'), _schema_fingerprint(schema_info), schema_info
+        )
         
-        csv_template = template_df.to_csv(index=False)
         st.download_button(
             label="📥 Download Metadata Template",
             data=csv_template,
@@ -370,7 +475,7 @@ class SetupWizard:
             mime="text/csv"
         )
         
-        st.info(f"📊 Template contains {len(template_df)} rows for all your columns")
+        st.info(f"📊 Template contains {template_rows} rows for all your columns")
         
         # Step 2: Upload completed template
         st.write("**Step 2: Upload Completed Template**")
@@ -382,23 +487,26 @@ class SetupWizard:
         
         if uploaded_file is not None:
             try:
-                uploaded_df = pd.read_csv(uploaded_file)
+                # Arrow's multithreaded parser; only the build step needs a pandas frame.
+                # Imported here so rendering the wizard doesn't load pyarrow's CSV module
+                import pyarrow.csv as pac
+                uploaded_table = pac.read_csv(uploaded_file)
                 
                 # Validate
                 required_columns = ['table_name', 'real_col_name', 'alias_name', 'type', 'description']
-                missing_columns = [col for col in required_columns if col not in uploaded_df.columns]
+                missing_columns = [col for col in required_columns if col not in uploaded_table.column_names]
                 
                 if missing_columns:
                     st.error(f"❌ Missing required columns: {', '.join(missing_columns)}")
                 else:
-                    st.success(f"✅ Valid metadata file with {len(uploaded_df)} rows")
+                    st.success(f"✅ Valid metadata file with {uploaded_table.num_rows} rows")
                     
                     # Preview
                     with st.expander("📊 Data Preview"):
-                        st.dataframe(uploaded_df.head(10))
+                        st.dataframe(uploaded_table.slice(0, 10))
                     
                     if st.button("🏗️ Build Semantic Layer", type="primary", use_container_width=True):
-                        self._execute_manual_semantic_build(uploaded_df)
+                        self._execute_manual_semantic_build(uploaded_table.to_pandas())
                         
             except Exception as e:
                 st.error(f"❌ Error reading file: {str(e)}")
@@ -412,7 +520,7 @@ class SetupWizard:
             if st.button("🤖 Generate Initial Metadata", type="primary", use_container_width=True):
                 with st.spinner("🤖 AI is generating metadata..."):
                     try:
-                        generated_metadata = enhanced_semantic_layer.generate_automatic_enhanced_metadata(
+                        generated_metadata = _get_enhanced_semantic_layer().generate_automatic_enhanced_metadata(
                             st.session_state.schema_info
                         )
                         st.session_state.generated_metadata = generated_metadata
@@ -496,62 +604,28 @@ class SetupWizard:
     def _test_database_connection(self, db_type: str, params: dict) -> bool:
         """Test database connection"""
         try:
-            if db_type == "PostgreSQL":
-                # Update settings temporarily for connection test
-                original_settings = {
-                    'host': settings.postgres_host,
-                    'port': settings.postgres_port,
-                    'db': settings.postgres_db,
-                    'user': settings.postgres_user,
-                    'password': settings.postgres_password
-                }
-                
-                # Temporarily update settings
-                settings.postgres_host = params.get('host', 'localhost')
-                settings.postgres_port = params.get('port', 5432)
-                settings.postgres_db = params.get('database', '')
-                settings.postgres_user = params.get('username', '')
-                settings.postgres_password = params.get('password', '')
-                
-                success = db_manager.connect("postgresql")
-                
-                # Restore original settings
-                for key, value in original_settings.items():
-                    setattr(settings, f'postgres_{key}', value)
-                
-                return success
-                
-            elif db_type == "MySQL":
-                settings.mysql_host = params.get('host', 'localhost')
-                settings.mysql_port = params.get('port', 3306)
-                settings.mysql_db = params.get('database', '')
-                settings.mysql_user = params.get('username', '')
-                settings.mysql_password = params.get('password', '')
-                
-                return db_manager.connect("mysql")
-                
-            elif db_type == "Oracle":
-                settings.oracle_host = params.get('host', 'localhost')
-                settings.oracle_port = params.get('port', 1521)
-                settings.oracle_service = params.get('service', '')
-                settings.oracle_user = params.get('username', '')
-                settings.oracle_password = params.get('password', '')
-                
-                return db_manager.connect("oracle")
-                
-            elif db_type == "DynamoDB":
-                return nosql_manager.connect_dynamodb(
-                    region_name=params.get('region', 'us-east-1'),
-                    aws_access_key_id=params.get('access_key', ''),
-                    aws_secret_access_key=params.get('secret_key', '')
+            if db_type in SQL_DB_TYPES:
+                return db_manager.connect(db_type.lower(), engine=get_sql_engine(db_type.lower(), **params))
+            
+            aws_args = (
+                params.get('region', 'us-east-1'),
+                params.get('access_key', ''),
+                params.get('secret_key', '')
+            )
+            
+            if db_type == "DynamoDB":
+                return _get_nosql_manager().connect_dynamodb(
+                    region_name=aws_args[0],
+                    client=get_boto_client('dynamodb', *aws_args),
+                    resource=get_boto_resource('dynamodb', *aws_args)
                 )
                 
             else:  # Athena
-                return nosql_manager.connect_athena(
-                    region_name=params.get('region', 'us-east-1'),
-                    aws_access_key_id=params.get('access_key', ''),
-                    aws_secret_access_key=params.get('secret_key', ''),
-                    s3_output_location=params.get('s3_output', 's3://aws-athena-query-results-default/')
+                return _get_nosql_manager().connect_athena(
+                    region_name=aws_args[0],
+                    s3_output_location=params.get('s3_output', 's3://aws-athena-query-results-default/'),
+                    client=get_boto_client('athena', *aws_args),
+                    s3_client=get_boto_client('s3', *aws_args)
                 )
                 
         except Exception as e:
@@ -568,11 +642,17 @@ class SetupWizard:
             progress_bar = st.progress(0)
             status_text = st.empty()
             table_progress = st.empty()
+            completed_cols = st.container().columns(3)
+            remaining_text = st.empty()
             
-            # Track completed tables
+            # Track completed tables; remaining keeps schema order
             completed_tables = []
+            remaining = dict.fromkeys(schema_info)
+            last_refresh = 0.0
             
             def progress_callback(message: str, current: int, total: int):
+                nonlocal last_refresh
+                
                 # Update progress bar
                 progress = current / total if total > 0 else 0
                 progress_bar.progress(progress)
@@ -580,49 +660,28 @@ class SetupWizard:
                 # Update status text
                 status_text.info(f"🤖 {message}")
                 
-                # Update table progress display
+                # Append only the newly completed table instead of redrawing the whole grid
                 if "✅ Completed:" in message:
                     table_name = message.replace("✅ Completed: ", "")
+                    completed_cols[len(completed_tables) % len(completed_cols)].success(f"✅ {table_name}")
                     completed_tables.append(table_name)
-                
-                # Show completed tables with checkmarks
-                if completed_tables:
-                    progress_html = "<div style='background-color: #f8f9fa; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;'>"
-                    progress_html += f"<h4>📊 Progress: {len(completed_tables)}/{total_tables} tables completed</h4>"
-                    
-                    # Show completed tables in columns
-                    cols_per_row = 3
-                    for i in range(0, len(completed_tables), cols_per_row):
-                        progress_html += "<div style='display: flex; gap: 1rem; margin: 0.5rem 0;'>"
-                        for j in range(cols_per_row):
-                            if i + j < len(completed_tables):
-                                table_name = completed_tables[i + j]
-                                progress_html += f"<div style='flex: 1; background-color: #d4edda; padding: 0.5rem; border-radius: 0.3rem; border-left: 3px solid #28a745;'>✅ {table_name}</div>"
-                            else:
-                                progress_html += "<div style='flex: 1;'></div>"
-                        progress_html += "</div>"
-                    
-                    # Show remaining tables
-                    remaining_tables = [name for name in schema_info.keys() if name not in completed_tables]
-                    if remaining_tables:
-                        progress_html += "<h5>⏳ Remaining tables:</h5>"
-                        for i in range(0, len(remaining_tables), cols_per_row):
-                            progress_html += "<div style='display: flex; gap: 1rem; margin: 0.5rem 0;'>"
-                            for j in range(cols_per_row):
-                                if i + j < len(remaining_tables):
-                                    table_name = remaining_tables[i + j]
-                                    progress_html += f"<div style='flex: 1; background-color: #fff3cd; padding: 0.5rem; border-radius: 0.3rem; border-left: 3px solid #ffc107;'>⏳ {table_name}</div>"
-                                else:
-                                    progress_html += "<div style='flex: 1;'></div>"
-                            progress_html += "</div>"
-                    
-                    progress_html += "</div>"
-                    table_progress.markdown(progress_html, unsafe_allow_html=True)
+                    remaining.pop(table_name, None)
+                    table_progress.markdown(f"#### 📊 Progress: {len(completed_tables)}/{total_tables} tables completed")
+                
+                # The remaining list is the expensive part, so redraw it at most once per interval
+                now = time.monotonic()
+                if completed_tables and (not remaining or now - last_refresh >= PROGRESS_REFRESH_SECONDS):
+                    last_refresh = now
+                    if remaining:
+                        remaining_text.warning(f"⏳ Remaining tables: {', '.join(remaining)}")
+                    else:
+                        remaining_text.empty()
             
             # Start the generation process
             status_text.info("🚀 Starting automatic semantic layer generation...")
             
             # Generate enhanced metadata with progress tracking
+            enhanced_semantic_layer = _get_enhanced_semantic_layer()
             enhanced_metadata = enhanced_semantic_layer.generate_automatic_enhanced_metadata(
                 schema_info, progress_callback=progress_callback
             )
@@ -688,6 +747,8 @@ class SetupWizard:
         """Execute manual semantic build"""
         try:
             with st.spinner("🏗️ Building semantic layer from your metadata..."):
+                enhanced_semantic_layer = _get_enhanced_semantic_layer()
+                
                 # Convert DataFrame to enhanced metadata format
                 enhanced_metadata = enhanced_semantic_layer.import_enhanced_metadata_from_dataframe(metadata_df)
                 
@@ -714,6 +775,8 @@ class SetupWizard:
         """Execute hybrid semantic build"""
         try:
             with st.spinner("🔄 Building hybrid semantic layer..."):
+                enhanced_semantic_layer = _get_enhanced_semantic_layer()
+                
                 # Convert DataFrame to enhanced metadata format
                 enhanced_metadata = enhanced_semantic_layer.import_enhanced_metadata_from_dataframe(metadata_df)
                 
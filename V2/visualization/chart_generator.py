@@ -3,6 +3,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
@@ -374,23 +375,28 @@ class ChartGenerator:
             return [self._create_empty_chart("No data available")]
         
         analysis = self.analyze_data_for_visualization(df, user_query)
-        charts = []
         
         # Create up to 3 different chart types
         recommended_charts = analysis["recommended_charts"][:3]
         
-        for chart_type in recommended_charts:
-            try:
-                chart = self.create_chart(df, chart_type)
-                charts.append(chart)
-            except Exception as e:
-                logger.error(f"Failed to create {chart_type} chart: {str(e)}")
+        # The figures are independent, so they are built concurrently; map keeps the recommendation order
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            built = list(executor.map(lambda chart_type: self._try_create_chart(df, chart_type), recommended_charts))
+        charts = [chart for chart in built if chart is not None]
         
         # Ensure at least one chart
         if not charts:
             charts.append(self._create_table_chart(df))
         
         return charts
+    
+    def _try_create_chart(self, df: pd.DataFrame, chart_type: str) -> Optional[go.Figure]:
+        """Create one dashboard chart, returning None if it fails"""
+        try:
+            return self.create_chart(df, chart_type)
+        except Exception as e:
+            logger.error(f"Failed to create {chart_type} chart: {str(e)}")
+            return None
 
 # Global instance
 chart_generator = ChartGenerator()